@@ -3,19 +3,32 @@ Streamlit dashboard for the Matchbook trading system.
 Dark-mode UI with header metrics, goal tracker, active positions, panic hedge, and equity chart.
 """
 
+import functools
+import hashlib
 import time
-from datetime import datetime
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
 
+import pandas as pd
 import plotly.graph_objects as go
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
 import db
-from matchbook_api import MatchbookClient, MatchbookAPIError, greening_up_lay_stake, lay_liability
+from matchbook_api import (
+    MatchbookAPIError,
+    MatchbookAuthError,
+    MatchbookClient,
+    MatchbookRateLimitError,
+    greening_up_lay_stake,
+    lay_liability,
+)
 
 # Bot considered "running" if last snapshot within this many seconds
 BOT_ACTIVE_THRESHOLD_SEC = 120
 
-# Page config - dark theme
+# Page config - dark theme colors live in .streamlit/config.toml
 st.set_page_config(
     page_title="Matchbook Trading Dashboard",
     page_icon="📈",
@@ -23,107 +36,272 @@ st.set_page_config(
     initial_sidebar_state="collapsed",
 )
 
-# Dark mode CSS
-st.markdown(
-    """
-    <style>
-    .stApp {
-        background-color: #0e1117;
-    }
-    .metric-card {
-        background: linear-gradient(135deg, #1e2130 0%, #252938 100%);
-        padding: 1rem 1.5rem;
-        border-radius: 8px;
-        border: 1px solid #31333f;
-        margin-bottom: 1rem;
-    }
-    .metric-label {
-        color: #8b8fa3;
-        font-size: 0.85rem;
-    }
-    .metric-value {
-        color: #fafafa;
-        font-size: 1.5rem;
-        font-weight: 600;
-    }
-    </style>
-    """,
-    unsafe_allow_html=True,
-)
-
 # Constants
 TARGET_BANKROLL = 5000.0
 STARTING_BANKROLL = 25.0
 
+# Cached API reads expire within the shortest allowed refresh interval (10s),
+# so every auto-refresh sees fresh data while widget reruns hit the cache
+API_CACHE_TTL_SEC = 10
+
+# Transient API failures (5xx, exhausted network retries) are retried with
+# exponential backoff before a read gives up: 0.5s, then 1s
+API_RETRY_TRIES = 3
+API_RETRY_BACKOFF_SEC = 0.5
+
+# After a failed login, the session waits this long before trying again
+LOGIN_RETRY_SEC = 10
+
+# The equity chart redraws on a slower cadence than the live sections: it
+# is the heaviest element on the page and only gains one point per bot cycle
+EQUITY_REFRESH_SEC = 300
+
+# Trade history rows sent to the browser per page
+TRADES_PAGE_SIZE = 20
+
+# Above this many points the equity curve is drawn with WebGL instead of SVG
+WEBGL_POINT_THRESHOLD = 1000
+
+# Longer equity histories are downsampled (LTTB) to this many points
+EQUITY_MAX_POINTS = 2000
+
+# Figures and frames are keyed on data that keeps changing; only the newest
+# entry is hit again, so keep just a few
+RENDER_CACHE_MAX_ENTRIES = 4
+
+
+@st.cache_resource(ttl=900)
+def _get_client() -> MatchbookClient:
+    """
+    Authenticated Matchbook client shared across reruns and sessions.
+    A failed login raises, so it is never cached; the TTL forces a periodic
+    re-login, which also refreshes the cached account balance.
+    """
+    client = MatchbookClient()
+    client.login()
+    return client
+
+
+@st.cache_resource
+def _init_db() -> bool:
+    """Create tables and seed settings once per server process, not per rerun."""
+    db.init_db()
+    return True
+
+
+@st.cache_resource
+def _cache_stats() -> dict[str, dict]:
+    """Per-cache call/miss counters; process-wide like the caches themselves."""
+    return {}
+
+
+def observed_cache_data(name: str, **cache_kwargs):
+    """
+    st.cache_data that also counts calls and misses and times each miss,
+    so the sidebar Cache panel can show when a cache stops hitting.
+    """
+
+    def decorate(func):
+        stats = _cache_stats().setdefault(
+            name, {"calls": 0, "misses": 0, "last_miss": None, "last_miss_ms": 0.0}
+        )
+
+        @functools.wraps(func)
+        def on_miss(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stats["misses"] += 1
+                stats["last_miss"] = datetime.now().strftime("%H:%M:%S")
+                stats["last_miss_ms"] = (time.perf_counter() - started) * 1000
+
+        cached = st.cache_data(**cache_kwargs)(on_miss)
+
+        @functools.wraps(func)
+        def call(*args, **kwargs):
+            stats["calls"] += 1
+            return cached(*args, **kwargs)
+
+        call.clear = cached.clear
+        return call
+
+    return decorate
+
+
+def retry_api_call(func):
+    """
+    Retry a Matchbook read with exponential backoff, only when the failure can
+    pass: transport errors and 5xx responses. Auth errors, rate limits (the
+    client has already waited those out) and other 4xx are raised immediately.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in range(API_RETRY_TRIES):
+            try:
+                return func(*args, **kwargs)
+            except (MatchbookAuthError, MatchbookRateLimitError):
+                raise
+            except MatchbookAPIError as e:
+                if e.status_code is not None and e.status_code < 500:
+                    raise
+                if attempt == API_RETRY_TRIES - 1:
+                    raise
+                time.sleep(API_RETRY_BACKOFF_SEC * 2**attempt)
+
+    return wrapper
+
+
+def _reset_client_on_auth_error(e: Exception) -> None:
+    """Drop the shared client when its session can no longer be re-established."""
+    if isinstance(e, MatchbookAuthError):
+        _get_client.clear()
+
 
 def get_api_client():
     """
-    Return authenticated Matchbook client. Caches in session_state to avoid
-    repeated logins (which trigger 429 rate limit).
+    Return authenticated Matchbook client, or None if login fails.
+    The client is cached via st.cache_resource to avoid repeated logins
+    (which trigger 429 rate limit). Failures are not cached there, so a
+    failed login is remembered in session state for LOGIN_RETRY_SEC.
     """
-    if "matchbook_client" in st.session_state and st.session_state.matchbook_client is not None:
-        return st.session_state.matchbook_client
+    failed_at = st.session_state.get("api_client_failed_at")
+    if failed_at is not None and time.monotonic() - failed_at < LOGIN_RETRY_SEC:
+        return None
     try:
-        client = MatchbookClient()
-        client.login()
-        st.session_state.matchbook_client = client
-        if "matchbook_last_error" in st.session_state:
-            del st.session_state.matchbook_last_error
-        return client
+        client = _get_client()
     except (MatchbookAPIError, Exception) as e:
         st.session_state.matchbook_last_error = str(e)[:100]
+        st.session_state.api_client_failed_at = time.monotonic()
         return None
+    st.session_state.pop("api_client_failed_at", None)
+    if "matchbook_last_error" in st.session_state:
+        del st.session_state.matchbook_last_error
+    return client
+
+
+@observed_cache_data("account", ttl=API_CACHE_TTL_SEC, show_spinner=False)
+@retry_api_call
+def _fetch_account(_client: MatchbookClient) -> dict:
+    """Account (balance, free-funds, exposure). The client is not part of the cache key."""
+    return _client.get_account()
+
+
+@observed_cache_data("offers", ttl=API_CACHE_TTL_SEC, show_spinner=False)
+@retry_api_call
+def _fetch_offers(_client: MatchbookClient) -> list[dict]:
+    """Open and matched offers. The client is not part of the cache key."""
+    data = _client.get_offers(status="open,matched", per_page=50)
+    return data.get("offers", [])
+
 
+def _invalidate_api_cache() -> None:
+    """Drop cached API reads after an action that changes account or offers."""
+    _fetch_account.clear()
+    _fetch_offers.clear()
+    st.session_state.pop("account_snapshot", None)
 
-def get_balance_from_api() -> tuple[float | None, float | None, int | None]:
+
+def fetch_account_snapshot(client: MatchbookClient | None) -> dict:
     """
-    Fetch balance, exposure, and phase from Matchbook API.
-    Returns (balance, exposure, phase) or (None, None, None) on failure.
+    Connection status and account figures from a single account read:
+    {"connected", "message", "balance", "exposure", "phase"}.
+    Balance, exposure and phase are None when the account is unavailable.
+    Held in st.session_state for API_CACHE_TTL_SEC, so the page and its
+    fragments share one snapshot per refresh window, failures included.
     """
-    client = get_api_client()
+    held = st.session_state.get("account_snapshot")
+    now = time.monotonic()
+    if held is not None and now - held[0] < API_CACHE_TTL_SEC:
+        return held[1]
+    snapshot = _read_account_snapshot(client)
+    st.session_state.account_snapshot = (now, snapshot)
+    return snapshot
+
+
+def _read_account_snapshot(client: MatchbookClient | None) -> dict:
+    """Build the account snapshot from the cached account read."""
+    snapshot = {"connected": False, "message": "", "balance": None, "exposure": None, "phase": None}
     if not client:
-        return None, None, None
+        msg = st.session_state.get("matchbook_last_error", "Unknown error")
+        snapshot["message"] = f"Failed — {msg}"
+        return snapshot
     try:
-        account = client.get_account()
+        account = _fetch_account(client)
         balance = float(account.get("balance", 0) or 0)
         exposure = float(account.get("exposure", 0) or 0)
-        phase = 1 if 25 <= balance < 200 else 2
-        return balance, exposure, phase
-    except Exception:
-        return None, None, None
+    except Exception as e:
+        _reset_client_on_auth_error(e)
+        snapshot["message"] = f"Failed — {str(e)[:100]}"
+        return snapshot
+    snapshot.update(
+        connected=True,
+        message="Connected",
+        balance=balance,
+        exposure=exposure,
+        phase=1 if 25 <= balance < 200 else 2,
+    )
+    return snapshot
 
 
-def get_offers_from_api() -> list[dict]:
+def get_offers_from_api(client: MatchbookClient | None) -> list[dict]:
     """Fetch open and matched offers from Matchbook API."""
-    client = get_api_client()
     if not client:
         return []
     try:
-        data = client.get_offers(status="open,matched", per_page=50)
-        return data.get("offers", [])
-    except MatchbookAPIError:
+        return _fetch_offers(client)
+    except MatchbookAPIError as e:
+        _reset_client_on_auth_error(e)
         return []
 
 
-def get_connection_status() -> tuple[bool, str]:
-    """Return (connected, message) for Matchbook API connection status."""
-    client = get_api_client()
-    if client:
-        return True, "Connected"
-    msg = st.session_state.get("matchbook_last_error", "Unknown error")
-    return False, f"Failed — {msg}"
+@st.cache_resource
+def _get_fetch_pool() -> ThreadPoolExecutor:
+    """Worker pool for concurrent API reads, shared across reruns and sessions."""
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="matchbook-fetch")
+
+
+def _submit_with_ctx(pool: ThreadPoolExecutor, fn, *args) -> Future:
+    """
+    Submit fn to the pool with this run's script context attached, so the
+    worker can use st.session_state and the Streamlit caches.
+    """
+    ctx = get_script_run_ctx()
 
+    def task():
+        add_script_run_ctx(None, ctx)
+        return fn(*args)
 
-def get_bot_status() -> tuple[str, str, str]:
-    """Return (status, detail, last_ts_formatted) for bot."""
-    last_ts = db.get_last_snapshot_time()
+    return pool.submit(task)
+
+
+def fetch_api_state(client: MatchbookClient | None) -> tuple[dict, list[dict]]:
+    """
+    Fetch the account snapshot and offers concurrently.
+    The calls are independent round-trips, so the page waits for the
+    slowest one rather than their sum.
+    """
+    pool = _get_fetch_pool()
+    account_future = _submit_with_ctx(pool, fetch_account_snapshot, client)
+    offers_future = _submit_with_ctx(pool, get_offers_from_api, client)
+    return account_future.result(), offers_future.result()
+
+
+def get_bot_status(last_ts: str | None) -> tuple[str, str, str]:
+    """Return (status, detail, last_ts_formatted) for bot from the last snapshot time."""
     if not last_ts:
         return "Unknown", "No snapshots yet", ""
     ts_display = last_ts[:19].replace("T", " ") if last_ts else ""
     try:
-        ts_compact = last_ts.replace("T", " ").replace("Z", "")[:19]
-        dt = datetime.strptime(ts_compact, "%Y-%m-%d %H:%M:%S")
-        age_sec = (datetime.utcnow() - dt).total_seconds()
+        # Parse once per snapshot: the timestamp only changes when the bot writes
+        cached = st.session_state.get("last_snapshot_parsed")
+        if cached is None or cached[0] != last_ts:
+            # Snapshots are written as naive UTC isoformat strings
+            cached = (last_ts, datetime.fromisoformat(last_ts.rstrip("Z")).replace(tzinfo=timezone.utc))
+            st.session_state.last_snapshot_parsed = cached
+        dt = cached[1]
+        age_sec = (datetime.now(timezone.utc) - dt).total_seconds()
         if age_sec < BOT_ACTIVE_THRESHOLD_SEC:
             return "Running", f"Last snapshot {int(age_sec)}s ago", ts_display
         return "Offline or idle", f"Last snapshot {int(age_sec // 60)}m ago", ts_display
@@ -131,169 +309,277 @@ def get_bot_status() -> tuple[str, str, str]:
         return "Unknown", last_ts[:30], ts_display
 
 
-def cancel_offer(offer_id: int) -> tuple[bool, str]:
-    """Cancel a single open offer by ID."""
-    client = get_api_client()
+def cancel_offer(offer_id: int, client: MatchbookClient | None = None) -> tuple[bool, str]:
+    """Cancel a single open offer by ID using an already logged-in client."""
     if not client:
         return False, "Not logged in."
     try:
         client.cancel_offers(offer_ids=[offer_id])
+        _invalidate_api_cache()
         return True, f"Offer {offer_id} cancelled."
     except MatchbookAPIError as e:
+        _reset_client_on_auth_error(e)
         return False, str(e)
 
 
-def panic_hedge() -> tuple[bool, str]:
+def build_price_index(events: list[dict]) -> dict[tuple, dict[str, float]]:
+    """
+    Flatten events -> markets -> runners -> prices into
+    {(event_id, market_id, runner_id): {side: odds}} in a single pass,
+    keeping the first (best) price listed for each side.
+    """
+    index = {}
+    for ev in events:
+        for mkt in ev.get("markets", []):
+            for r in mkt.get("runners", []):
+                best = {}
+                for p in r.get("prices", []):
+                    best.setdefault(p.get("side"), p.get("decimal-odds") or p.get("odds"))
+                index[(ev.get("id"), mkt.get("id"), r.get("id"))] = best
+    return index
+
+
+def panic_hedge(client: MatchbookClient | None = None) -> tuple[bool, str]:
     """
     Emergency close: for each matched position, place offsetting order at market.
+    Takes an already logged-in client so the emergency path never waits on a login.
     Returns (success, message).
     """
-    client = get_api_client()
     if not client:
         return False, "Not logged in. Check .env credentials."
 
     try:
-        offers = client.get_offers(status="matched", per_page=50)
+        offers = retry_api_call(client.get_offers)(status="matched", per_page=50)
         matched = [o for o in offers.get("offers", []) if o.get("status") == "matched"]
         if not matched:
             return True, "No matched positions to hedge."
 
-        events_data = client.get_events(
+        # Only the events we hold positions in, not every open event
+        # Sorted so identical position sets produce identical requests
+        needed_event_ids = sorted({o.get("event-id") for o in matched if o.get("event-id")})
+        if not needed_event_ids:
+            return False, "No prices available to hedge matched positions."
+        events_data = retry_api_call(client.get_events)(
             include_prices=True,
             price_depth=1,
             states="open,suspended",
-            per_page=50,
+            per_page=len(needed_event_ids),
+            ids=",".join(str(x) for x in needed_event_ids),
         )
-        events_by_id = {e["id"]: e for e in events_data.get("events", [])}
+        price_index = build_price_index(events_data.get("events", []))
 
+        hedge_orders = []
         for offer in matched:
             side = offer.get("side")
             runner_id = offer.get("runner-id")
-            back_odds = offer.get("decimal-odds") or offer.get("odds")
-            back_stake = offer.get("stake", 0)
-            event_id = offer.get("event-id")
-            market_id = offer.get("market-id")
-
-            # Find current best price for offsetting
-            best_lay = None
-            ev = events_by_id.get(event_id)
-            if ev:
-                for mkt in ev.get("markets", []):
-                    if mkt.get("id") != market_id:
-                        continue
-                    for r in mkt.get("runners", []):
-                        if r.get("id") == runner_id:
-                            for p in r.get("prices", []):
-                                if p.get("side") == "lay":
-                                    best_lay = p.get("decimal-odds") or p.get("odds")
-                                    break
-                            break
+            offer_odds = offer.get("decimal-odds") or offer.get("odds")
+            offer_stake = offer.get("stake", 0)
+            # Current best prices for offsetting, one lookup per offer
+            best = price_index.get((offer.get("event-id"), offer.get("market-id"), runner_id), {})
+            best_lay = best.get("lay")
+            best_back = best.get("back")
 
             if side == "back" and best_lay:
                 # We're long (Back matched) - Lay to close
-                lay_stake = greening_up_lay_stake(back_stake, back_odds, best_lay)
-                client.submit_offers(
-                    offers=[
-                        {
-                            "runner-id": runner_id,
-                            "side": "lay",
-                            "odds": best_lay,
-                            "stake": round(lay_stake, 2),
-                            "keep-in-play": False,
-                        }
-                    ]
+                lay_stake = greening_up_lay_stake(offer_stake, offer_odds, best_lay)
+                hedge_orders.append(
+                    {
+                        "runner-id": runner_id,
+                        "side": "lay",
+                        "odds": best_lay,
+                        "stake": round(lay_stake, 2),
+                        "keep-in-play": False,
+                    }
                 )
-            elif side == "lay":
+            elif side == "lay" and best_back:
                 # We're short (Lay matched) - Back to close at best back
-                best_back = None
-                ev = events_by_id.get(event_id)
-                if ev:
-                    for mkt in ev.get("markets", []):
-                        for r in mkt.get("runners", []):
-                            if r.get("id") == runner_id:
-                                for p in r.get("prices", []):
-                                    if p.get("side") == "back":
-                                        best_back = p.get("decimal-odds") or p.get("odds")
-                                        break
-                                break
-                if best_back:
-                    # Greening: Back_stake = Lay_stake * Lay_odds / Back_odds
-                    lay_stake = offer.get("stake", 0)
-                    lay_odds = offer.get("decimal-odds") or offer.get("odds")
-                    back_close_stake = greening_up_lay_stake(lay_stake, lay_odds, best_back)
-                    client.submit_offers(
-                        offers=[
-                            {
-                                "runner-id": runner_id,
-                                "side": "back",
-                                "odds": best_back,
-                                "stake": round(back_close_stake, 2),
-                                "keep-in-play": False,
-                            }
-                        ]
-                    )
+                # Greening: Back_stake = Lay_stake * Lay_odds / Back_odds
+                back_close_stake = greening_up_lay_stake(offer_stake, offer_odds, best_back)
+                hedge_orders.append(
+                    {
+                        "runner-id": runner_id,
+                        "side": "back",
+                        "odds": best_back,
+                        "stake": round(back_close_stake, 2),
+                        "keep-in-play": False,
+                    }
+                )
 
+        if not hedge_orders:
+            return False, "No prices available to hedge matched positions."
+
+        # One POST for every closing order: a single round-trip, and all
+        # orders are priced against the same book snapshot
+        result = client.submit_offers(offers=hedge_orders)
+        _invalidate_api_cache()
+        failed = [o for o in result.get("offers", []) if o.get("status") == "failed"]
+        if failed:
+            return False, f"{len(failed)} of {len(hedge_orders)} hedge orders failed."
         return True, "Panic hedge orders submitted."
     except MatchbookAPIError as e:
+        _reset_client_on_auth_error(e)
         return False, str(e)
     except Exception as e:
         return False, str(e)
 
 
-def main():
-    st.title("Matchbook Trading Dashboard")
-    st.caption("Automated trading system — £25 → £5,000 target")
-
-    # Initialize DB
-    db.init_db()
+@observed_cache_data("pnl_fig", max_entries=RENDER_CACHE_MAX_ENTRIES, show_spinner=False)
+def build_pnl_fig(dates: tuple, pnls: tuple) -> go.Figure:
+    """Daily P&L bar chart. Cached on the data tuples, so unchanged data skips the rebuild."""
+    colors = ["#00d4aa" if p >= 0 else "#ff6b6b" for p in pnls]
+    fig = go.Figure(go.Bar(x=dates, y=pnls, marker_color=colors, name="Daily P&L (£)"))
+    fig.update_layout(
+        template="plotly_dark",
+        paper_bgcolor="rgba(0,0,0,0)",
+        plot_bgcolor="rgba(0,0,0,0)",
+        xaxis_title="Date",
+        yaxis_title="P&L (£)",
+        margin=dict(l=40, r=40, t=40, b=40),
+        height=250,
+    )
+    return fig
 
-    # Bot control - must enable trading before bot places any orders
-    st.subheader("Bot Control")
-    trading_enabled = db.is_trading_enabled()
-    event_id = db.get_event_id() or ""
 
-    col_ctrl1, col_ctrl2, col_ctrl3 = st.columns([1, 1, 2])
-    with col_ctrl1:
-        if trading_enabled:
-            if st.button("Disable Trading", type="secondary"):
-                db.set_trading_enabled(False)
-                st.success("Trading disabled. Bot will not place new orders.")
-                st.rerun()
-        else:
-            if st.button("Enable Trading", type="primary"):
-                db.set_trading_enabled(True)
-                st.success("Trading enabled. Bot will place orders on next cycle.")
-                st.rerun()
-    with col_ctrl2:
-        st.metric("Trading", "ON" if trading_enabled else "OFF")
-    with col_ctrl3:
-        new_event_id = st.text_input(
-            "Event ID (focus on single event)",
-            value=event_id,
-            placeholder="e.g. 32363927044601045 — leave empty for all events",
-            help="Enter a Matchbook event ID to trade only that event.",
+def lttb_indices(values: tuple, n_out: int) -> list[int]:
+    """
+    Largest-Triangle-Three-Buckets: pick n_out indices of values that keep
+    the visual shape of the series, spikes included. Points are treated as
+    evenly spaced, which holds for one snapshot per bot cycle.
+    """
+    n = len(values)
+    if n_out >= n or n_out < 3:
+        return list(range(n))
+    every = (n - 2) / (n_out - 2)
+    picked = [0]
+    a = 0
+    for i in range(n_out - 2):
+        # Average of the next bucket is the third triangle vertex
+        nxt_start = int((i + 1) * every) + 1
+        nxt_end = min(int((i + 2) * every) + 1, n)
+        avg_x = (nxt_start + nxt_end - 1) / 2
+        avg_y = sum(values[nxt_start:nxt_end]) / (nxt_end - nxt_start)
+
+        ay = values[a]
+        best, best_area = nxt_start - 1, -1.0
+        for j in range(int(i * every) + 1, nxt_start):
+            area = abs((a - avg_x) * (values[j] - ay) - (a - j) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        picked.append(best)
+        a = best
+    picked.append(n - 1)
+    return picked
+
+
+@observed_cache_data("equity_fig", max_entries=RENDER_CACHE_MAX_ENTRIES, show_spinner=False)
+def build_equity_fig(_timestamps: tuple, _balances: tuple, count: int, last_ts: str) -> go.Figure:
+    """
+    Bankroll equity curve. Snapshots are only ever appended, so the cache is
+    keyed on (count, last_ts) instead of hashing the whole history per call.
+    """
+    if count > EQUITY_MAX_POINTS:
+        keep = lttb_indices(_balances, EQUITY_MAX_POINTS)
+        _timestamps = [_timestamps[i] for i in keep]
+        _balances = [_balances[i] for i in keep]
+
+    fig = go.Figure()
+    if len(_balances) > WEBGL_POINT_THRESHOLD:
+        # Long histories: WebGL rasterizes on the GPU; the area fill is dropped
+        # because it doubles the path the browser has to draw
+        trace = go.Scattergl(
+            x=_timestamps,
+            y=_balances,
+            mode="lines",
+            name="Balance",
+            line=dict(color="#00d4aa", width=2),
+        )
+    else:
+        trace = go.Scatter(
+            x=_timestamps,
+            y=_balances,
+            mode="lines",
+            name="Balance",
+            line=dict(color="#00d4aa", width=2),
+            fill="tozeroy",
+            fillcolor="rgba(0, 212, 170, 0.2)",
         )
-        if new_event_id != event_id:
-            db.set_event_id(new_event_id)
-            st.caption(f"Event filter: {new_event_id or 'All events'}")
+    fig.add_trace(trace)
+    fig.update_layout(
+        template="plotly_dark",
+        paper_bgcolor="rgba(0,0,0,0)",
+        plot_bgcolor="rgba(0,0,0,0)",
+        xaxis_title="Time",
+        yaxis_title="Balance (£)",
+        margin=dict(l=40, r=40, t=40, b=40),
+        height=400,
+    )
+    return fig
 
-    # Force Phase 1: use Phase 1 until you've grown to £200 and are ready for Phase 2
-    force_phase1 = db.is_force_phase1()
-    new_force = st.checkbox(
-        "Force Phase 1 (start with scalping until £200)",
-        value=force_phase1,
-        help="When checked, bot uses Phase 1 strategy regardless of balance. Uncheck to allow Phase 2 when balance reaches £200.",
+
+@observed_cache_data("positions_df", max_entries=RENDER_CACHE_MAX_ENTRIES, show_spinner=False)
+def build_positions_df(offers: list[dict]) -> pd.DataFrame:
+    """
+    Active positions table, built column-wise from the offers payload.
+    Object dtype keeps 17-digit Matchbook ids exact (no float coercion).
+    """
+    df = pd.DataFrame(offers, dtype=object).reindex(
+        columns=["event-name", "event_name", "event-id", "market-name", "runner-name",
+                 "side", "decimal-odds", "odds", "stake", "status"]
     )
-    if new_force != force_phase1:
-        db.set_force_phase1(new_force)
-        st.rerun()
+    fallback_name = "Event " + df["event-id"].fillna("").astype(str)
+    return pd.DataFrame({
+        "Event": df["event-name"].fillna(df["event_name"]).fillna(fallback_name),
+        "Market": df["market-name"].fillna(""),
+        "Runner": df["runner-name"].fillna(""),
+        "Side": df["side"].fillna("").astype(str).str.upper(),
+        "Odds": df["decimal-odds"].fillna(df["odds"]).fillna(0),
+        "Stake": df["stake"].fillna(0),
+        "Status": df["status"].fillna(""),
+        "Cancellable": df["status"] == "open",
+    })
+
+
+@observed_cache_data("trades_df", ttl=API_CACHE_TTL_SEC, show_spinner=False)
+def build_trades_df(trades: list[dict]) -> pd.DataFrame:
+    """Trade history table, built column-wise from the trades rows."""
+    df = pd.DataFrame(trades, dtype=object).reindex(
+        columns=["matched_at", "event_id", "runner_id", "side", "odds", "stake", "profit", "phase"]
+    )
+    profit = df["profit"]
+    return pd.DataFrame({
+        "Date": df["matched_at"].fillna("").astype(str).str.slice(0, 19).str.replace("T", " ", regex=False),
+        "Event ID": df["event_id"].fillna(""),
+        "Runner ID": df["runner_id"].fillna(""),
+        "Side": df["side"].fillna("").astype(str).str.upper(),
+        "Odds": df["odds"].fillna(0),
+        "Stake": df["stake"].fillna(0),
+        "Profit (£)": profit.where(profit.notna(), "—"),
+        "Phase": df["phase"].fillna(""),
+    })
+
+
+@observed_cache_data("dashboard_state", ttl=API_CACHE_TTL_SEC, show_spinner=False)
+def _load_dashboard_state() -> db.DashboardState:
+    """SQLite reads for one refresh window, shared by the page and its fragments."""
+    return db.get_dashboard_state(trades_limit=50, pnl_days=14)
+
+
+@observed_cache_data("equity_curve", ttl=API_CACHE_TTL_SEC, show_spinner=False)
+def _load_equity_curve() -> tuple[tuple[str, ...], tuple[float, ...]]:
+    """
+    Full bankroll history, cached apart from the dashboard state so the
+    status, metrics and positions fragments do not copy it on every tick.
+    """
+    return db.get_equity_curve()
 
-    st.divider()
 
-    # Status bar: Connection, Bot, Refresh interval, Manual refresh
-    conn_ok, conn_msg = get_connection_status()
-    bot_status, bot_detail, last_cycle_ts = get_bot_status()
-    refresh_interval = db.get_refresh_interval()
+def render_status_bar() -> None:
+    """Status bar: Connection, Bot, Refresh interval, Manual refresh."""
+    state = _load_dashboard_state()
+    account = fetch_account_snapshot(get_api_client())
+    conn_ok, conn_msg = account["connected"], account["message"]
+    bot_status, bot_detail, last_cycle_ts = get_bot_status(state.last_snapshot_time)
+    refresh_interval = state.refresh_interval
 
     col_status1, col_status2, col_status3, col_status4, col_status5 = st.columns([1, 1, 1, 1, 2])
     with col_status1:
@@ -328,101 +614,288 @@ def main():
         )
         if new_interval != refresh_interval:
             db.set_refresh_interval(int(new_interval))
-            st.rerun()
+            _load_dashboard_state.clear()
+            # Full rerun so every fragment picks up the new run_every
+            st.rerun(scope="app")
     with col_status4:
         st.caption("Refresh")
         if st.button("Refresh now"):
-            st.session_state.last_refresh = time.time()
-            st.rerun()
-
-    # Header metrics
-    api_balance, api_exposure, api_phase = get_balance_from_api()
-    db_balance = db.get_latest_balance()
-
-    balance = api_balance if api_balance is not None else db_balance or STARTING_BANKROLL
-    exposure = api_exposure if api_exposure is not None else 0.0
+            st.session_state.pop("api_client_failed_at", None)
+            _invalidate_api_cache()
+            _load_dashboard_state.clear()
+            _load_equity_curve.clear()
+            st.rerun(scope="app")
+
+
+@dataclass(frozen=True)
+class HeaderMetrics:
+    """Figures shown in the header metrics and goal tracker."""
+
+    balance: float
+    exposure: float
+    phase: int
+    daily_roi: float
+    cumulative_pnl: float
+    progress: float
+
+
+@functools.lru_cache(maxsize=64)
+def compute_metrics(
+    balance_pence: int,
+    exposure_pence: int,
+    api_phase: int | None,
+    daily_start_pence: int,
+    force_phase1: bool,
+) -> HeaderMetrics:
+    """
+    Derive the header figures from whole-pence inputs, so repeated fragment
+    ticks with an unchanged account resolve to one cached result.
+    daily_start_pence is 0 when no daily start balance is recorded.
+    """
+    balance = balance_pence / 100
     # Phase: use Force Phase 1 setting, else balance-based
-    if db.is_force_phase1():
+    if force_phase1:
         phase = 1
     else:
         phase = api_phase if api_phase is not None else (1 if balance < 200 else 2)
 
-    daily_start = db.get_daily_start_balance()
-    if daily_start and daily_start > 0:
-        daily_roi = (balance - daily_start) / daily_start * 100
+    if daily_start_pence > 0:
+        daily_roi = (balance_pence - daily_start_pence) / daily_start_pence * 100
     else:
         daily_roi = 0.0
 
-    cumulative_pnl = balance - STARTING_BANKROLL
+    progress = min(100.0, max(0.0, (balance - STARTING_BANKROLL) / (TARGET_BANKROLL - STARTING_BANKROLL) * 100))
+    return HeaderMetrics(
+        balance=balance,
+        exposure=exposure_pence / 100,
+        phase=phase,
+        daily_roi=daily_roi,
+        cumulative_pnl=balance - STARTING_BANKROLL,
+        progress=progress,
+    )
+
+
+def render_header_metrics() -> None:
+    """Header metrics and goal tracker."""
+    state = _load_dashboard_state()
+    account = fetch_account_snapshot(get_api_client())
+    api_balance, api_exposure = account["balance"], account["exposure"]
+
+    balance = api_balance if api_balance is not None else state.latest_balance or STARTING_BANKROLL
+    exposure = api_exposure if api_exposure is not None else 0.0
+    m = compute_metrics(
+        round(balance * 100),
+        round(exposure * 100),
+        account["phase"],
+        round((state.daily_start_balance or 0) * 100),
+        state.force_phase1,
+    )
 
     col1, col2, col3, col4, col5 = st.columns(5)
     with col1:
-        st.metric("Current Bankroll (£)", f"£{balance:.2f}")
+        st.metric("Current Bankroll (£)", f"£{m.balance:.2f}")
     with col2:
-        st.metric("Cumulative P&L (£)", f"£{cumulative_pnl:+.2f}")
+        st.metric("Cumulative P&L (£)", f"£{m.cumulative_pnl:+.2f}")
     with col3:
-        st.metric("Daily ROI (%)", f"{daily_roi:.2f}%")
+        st.metric("Daily ROI (%)", f"{m.daily_roi:.2f}%")
     with col4:
-        st.metric("Open Exposure (£)", f"£{exposure:.2f}")
+        st.metric("Open Exposure (£)", f"£{m.exposure:.2f}")
     with col5:
-        st.metric("Phase", f"Phase {phase}")
+        st.metric("Phase", f"Phase {m.phase}")
 
     # Goal tracker
     st.subheader("Goal Tracker")
-    progress = min(100.0, max(0.0, (balance - STARTING_BANKROLL) / (TARGET_BANKROLL - STARTING_BANKROLL) * 100))
-    st.progress(progress / 100)
-    st.caption(f"£25 → £5,000 | Progress: {progress:.1f}% (£{balance:.2f})")
+    st.progress(m.progress / 100)
+    st.caption(f"£25 → £5,000 | Progress: {m.progress:.1f}% (£{m.balance:.2f})")
+
+
+def positions_table_key(offers: list[dict]) -> str:
+    """Widget key for the positions table, unique to the offer ids in row order."""
+    ids = ",".join(str(o.get("id")) for o in offers)
+    return "positions_table_" + hashlib.blake2b(ids.encode(), digest_size=8).hexdigest()
+
 
-    # Active positions table (with event name and cancel per open offer)
+def render_active_positions() -> None:
+    """Active positions table (with event name and cancel for open offers)."""
     st.subheader("Active Positions")
-    offers = get_offers_from_api()
+    client = get_api_client()
+    offers = get_offers_from_api(client)
     if offers:
-        for o in offers:
-            is_open = o.get("status") == "open"
-            col_info, col_btn = st.columns([5, 1])
-            with col_info:
-                event_name = o.get("event-name") or o.get("event_name") or f"Event {o.get('event-id', '')}"
-                st.markdown(
-                    f"**{event_name}** · {o.get('market-name', '')} · {o.get('runner-name', '')} · "
-                    f"{o.get('side', '').upper()} @ {o.get('decimal-odds') or o.get('odds', 0)} · "
-                    f"£{o.get('stake', 0)} · *{o.get('status', '')}*"
-                )
-            with col_btn:
-                if is_open and st.button("Cancel", key=f"cancel_{o.get('id')}"):
-                    ok, msg = cancel_offer(o["id"])
-                    if ok:
-                        st.success(msg)
-                    else:
-                        st.error(msg)
-                    st.rerun()
+        # One table plus one button instead of a columns/markdown/button set per offer.
+        # The selection is a row index, so the key follows the offer ids: when the
+        # refreshed list differs, the table is a new widget and the selection clears
+        # rather than pointing at whichever offer now sits in that row.
+        positions = st.dataframe(
+            build_positions_df(offers),
+            use_container_width=True,
+            hide_index=True,
+            on_select="rerun",
+            selection_mode="single-row",
+            key=positions_table_key(offers),
+        )
+        selected_rows = positions.selection.rows
+        selected = offers[selected_rows[0]] if selected_rows and selected_rows[0] < len(offers) else None
+        can_cancel = selected is not None and selected.get("status") == "open"
+        clicked = st.button("Cancel selected offer", disabled=not can_cancel, help="Select an open offer in the table.")
+        if clicked and can_cancel:
+            ok, msg = cancel_offer(selected["id"], client)
+            if ok:
+                st.success(msg)
+            else:
+                st.error(msg)
+            st.rerun(scope="app")
     else:
         st.info("No active positions. Connect to Matchbook (check .env) or bot not running.")
 
-    # Trade history
+
+def _shift_trades_page(step: int) -> None:
+    st.session_state.trades_page = st.session_state.get("trades_page", 0) + step
+
+
+def render_trade_history() -> None:
+    """Trade history, one page of TRADES_PAGE_SIZE rows at a time."""
     st.subheader("Trade History")
-    trades = db.get_trades(limit=50)
-    if trades:
-        trade_rows = []
-        for t in trades:
-            trade_rows.append({
-                "Date": t.get("matched_at", "")[:19].replace("T", " ") if t.get("matched_at") else "",
-                "Event ID": t.get("event_id", ""),
-                "Runner ID": t.get("runner_id", ""),
-                "Side": (t.get("side", "") or "").upper(),
-                "Odds": t.get("odds", 0),
-                "Stake": t.get("stake", 0),
-                "Profit (£)": t.get("profit") if t.get("profit") is not None else "—",
-                "Phase": t.get("phase", ""),
-            })
-        st.dataframe(trade_rows, use_container_width=True, hide_index=True)
-    else:
+    trades = _load_dashboard_state().trades
+    if not trades:
         st.info("No trades yet. Completed trades will appear here.")
+        return
+    pages = -(-len(trades) // TRADES_PAGE_SIZE)
+    page = min(max(st.session_state.get("trades_page", 0), 0), pages - 1)
+    st.session_state.trades_page = page
+
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        st.button("Previous", disabled=page == 0, on_click=_shift_trades_page, args=(-1,))
+    with col_page:
+        st.caption(f"Page {page + 1} of {pages}")
+    with col_next:
+        st.button("Next", disabled=page == pages - 1, on_click=_shift_trades_page, args=(1,))
+
+    start = page * TRADES_PAGE_SIZE
+    st.dataframe(
+        build_trades_df(trades).iloc[start:start + TRADES_PAGE_SIZE],
+        use_container_width=True,
+        hide_index=True,
+    )
+
+
+def render_equity_curve() -> None:
+    """Analytics - equity curve."""
+    st.subheader("Bankroll Equity Curve")
+    timestamps, balances = _load_equity_curve()
+    if timestamps and balances:
+        st.plotly_chart(build_equity_fig(timestamps, balances, len(timestamps), timestamps[-1]), use_container_width=True)
+    else:
+        st.info("No bankroll data yet. Run the bot to record snapshots.")
+
+
+# Control callbacks run before the rerun the widget triggers, so the page
+# reads the new setting straight away without an extra st.rerun()
+def _on_trading_toggle() -> None:
+    enabled = st.session_state.trading_enabled_toggle
+    db.set_trading_enabled(enabled)
+    _load_dashboard_state.clear()
+    if enabled:
+        st.toast("Trading enabled. Bot will place orders on next cycle.")
+    else:
+        st.toast("Trading disabled. Bot will not place new orders.")
+
+
+def _on_force_phase1_toggle() -> None:
+    db.set_force_phase1(st.session_state.force_phase1_toggle)
+    _load_dashboard_state.clear()
+
+
+def _on_event_id_change() -> None:
+    """Persist the event filter once the input is committed (Enter or blur)."""
+    new_event_id = st.session_state.event_id_input
+    db.set_event_id(new_event_id)
+    _load_dashboard_state.clear()
+    st.toast(f"Event filter: {new_event_id or 'All events'}")
+
+
+def render_cache_panel() -> None:
+    """Sidebar panel with hit rates per cache, to catch a cache that stopped hitting."""
+    rows = []
+    for name, stats in _cache_stats().items():
+        calls = stats["calls"]
+        rows.append({
+            "Cache": name,
+            "Calls": calls,
+            "Misses": stats["misses"],
+            "Hit rate": f"{(1 - stats['misses'] / calls) * 100:.0f}%" if calls else "—",
+            "Last miss": stats["last_miss"] or "—",
+            "Miss (ms)": round(stats["last_miss_ms"], 1),
+        })
+    with st.sidebar.expander("Cache"):
+        st.dataframe(rows, use_container_width=True, hide_index=True)
+
+
+def main():
+    st.title("Matchbook Trading Dashboard")
+    st.caption("Automated trading system — £25 → £5,000 target")
+
+    # Initialize DB, then read everything the page needs in one go
+    _init_db()
+    state = _load_dashboard_state()
+
+    # Resolve the shared client once per rerun; every helper below reuses it
+    client = get_api_client()
+
+    # Bot control - must enable trading before bot places any orders
+    st.subheader("Bot Control")
+    trading_enabled = state.trading_enabled
+    event_id = state.event_id or ""
+
+    col_ctrl1, col_ctrl2, col_ctrl3 = st.columns([1, 1, 2])
+    with col_ctrl1:
+        st.toggle(
+            "Enable Trading",
+            value=trading_enabled,
+            key="trading_enabled_toggle",
+            on_change=_on_trading_toggle,
+        )
+    with col_ctrl2:
+        st.metric("Trading", "ON" if trading_enabled else "OFF")
+    with col_ctrl3:
+        st.text_input(
+            "Event ID (focus on single event)",
+            value=event_id,
+            placeholder="e.g. 32363927044601045 — leave empty for all events",
+            help="Enter a Matchbook event ID to trade only that event.",
+            key="event_id_input",
+            on_change=_on_event_id_change,
+        )
+
+    # Force Phase 1: use Phase 1 until you've grown to £200 and are ready for Phase 2
+    st.toggle(
+        "Force Phase 1 (start with scalping until £200)",
+        value=state.force_phase1,
+        help="When on, bot uses Phase 1 strategy regardless of balance. Turn off to allow Phase 2 when balance reaches £200.",
+        key="force_phase1_toggle",
+        on_change=_on_force_phase1_toggle,
+    )
+
+    st.divider()
+
+    # Warm both API caches concurrently; the live sections below read from them
+    fetch_api_state(client)
+
+    # Live sections rerun on their own every refresh_interval seconds, while
+    # the controls, trade history and P&L chart stay mounted
+    run_every = state.refresh_interval
+    st.fragment(render_status_bar, run_every=run_every)()
+    st.fragment(render_header_metrics, run_every=run_every)()
+    st.fragment(render_active_positions, run_every=run_every)()
+
+    # Paging reruns only this fragment, not the API reads above it
+    st.fragment(render_trade_history)()
 
     # Emergency control
     st.subheader("Emergency Control")
     if st.button("Panic Hedge / Close Position", type="primary"):
         with st.spinner("Submitting hedge orders..."):
-            ok, msg = panic_hedge()
+            ok, msg = panic_hedge(client)
         if ok:
             st.success(msg)
         else:
@@ -430,60 +903,14 @@ def main():
 
     # Daily P&L chart
     st.subheader("Daily P&L")
-    daily_pnl = db.get_daily_pnl(limit_days=14)
-    if daily_pnl:
-        dates = [d[0] for d in reversed(daily_pnl)]
-        pnls = [d[1] for d in reversed(daily_pnl)]
-        colors = ["#00d4aa" if p >= 0 else "#ff6b6b" for p in pnls]
-        fig_pnl = go.Figure(go.Bar(x=dates, y=pnls, marker_color=colors, name="Daily P&L (£)"))
-        fig_pnl.update_layout(
-            template="plotly_dark",
-            paper_bgcolor="rgba(0,0,0,0)",
-            plot_bgcolor="rgba(0,0,0,0)",
-            xaxis_title="Date",
-            yaxis_title="P&L (£)",
-            margin=dict(l=40, r=40, t=40, b=40),
-            height=250,
-        )
-        st.plotly_chart(fig_pnl, use_container_width=True)
+    if state.pnl_dates:
+        st.plotly_chart(build_pnl_fig(state.pnl_dates, state.pnl_values), use_container_width=True)
     else:
         st.info("No daily P&L data yet. Run the bot to record snapshots.")
 
-    # Analytics - equity curve
-    st.subheader("Bankroll Equity Curve")
-    timestamps, balances = db.get_equity_curve()
-    if timestamps and balances:
-        fig = go.Figure()
-        fig.add_trace(
-            go.Scatter(
-                x=timestamps,
-                y=balances,
-                mode="lines",
-                name="Balance",
-                line=dict(color="#00d4aa", width=2),
-                fill="tozeroy",
-                fillcolor="rgba(0, 212, 170, 0.2)",
-            )
-        )
-        fig.update_layout(
-            template="plotly_dark",
-            paper_bgcolor="rgba(0,0,0,0)",
-            plot_bgcolor="rgba(0,0,0,0)",
-            xaxis_title="Time",
-            yaxis_title="Balance (£)",
-            margin=dict(l=40, r=40, t=40, b=40),
-            height=400,
-        )
-        st.plotly_chart(fig, use_container_width=True)
-    else:
-        st.info("No bankroll data yet. Run the bot to record snapshots.")
+    st.fragment(render_equity_curve, run_every=max(run_every, EQUITY_REFRESH_SEC))()
 
-    # Auto-refresh
-    if "last_refresh" not in st.session_state:
-        st.session_state.last_refresh = time.time()
-    if time.time() - st.session_state.last_refresh > db.get_refresh_interval():
-        st.session_state.last_refresh = time.time()
-        st.rerun()
+    render_cache_panel()
 
 
 if __name__ == "__main__":
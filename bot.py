@@ -6,12 +6,15 @@ Heavy inline comments for formulas and API logic.
 
 import logging
 import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 from matchbook_api import (
     MatchbookAPIError,
     MatchbookClient,
+    MatchbookRateLimitError,
     add_ticks_to_odds,
     greening_up_lay_stake,
     lay_liability,
@@ -26,6 +29,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Events and offers are independent reads, so each cycle fetches them side by side
+_fetch_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="bot-fetch")
+
 
 def get_phase(balance: float) -> int:
     """
@@ -40,15 +46,17 @@ def get_phase(balance: float) -> int:
     return 1  # Below £25 still use Phase 1 logic (conservative)
 
 
-def get_stake(balance: float, phase: int) -> float:
-    """Calculate stake size based on phase and bankroll."""
-    if phase == 1:
-        stake = balance * config.STAKE_PCT_PHASE1
-        stake = max(config.MIN_STAKE, min(stake, config.MAX_STAKE_PHASE1))
-    else:
-        stake = balance * config.STAKE_PCT_PHASE2
-        stake = max(config.MIN_STAKE, min(stake, config.MAX_STAKE_PHASE2))
-    return round(stake, 2)
+def _make_stake_fn(pct: float, min_stake: float, max_stake: float):
+    """Return balance -> stake for one phase, with its config constants bound once."""
+
+    def stake_for(balance: float) -> float:
+        return round(max(min_stake, min(balance * pct, max_stake)), 2)
+
+    return stake_for
+
+
+stake_phase1 = _make_stake_fn(config.STAKE_PCT_PHASE1, config.MIN_STAKE, config.MAX_STAKE_PHASE1)
+stake_phase2 = _make_stake_fn(config.STAKE_PCT_PHASE2, config.MIN_STAKE, config.MAX_STAKE_PHASE2)
 
 
 def get_best_prices(runner: dict) -> tuple[Optional[float], Optional[float]]:
@@ -56,28 +64,72 @@ def get_best_prices(runner: dict) -> tuple[Optional[float], Optional[float]]:
     Extract best Back and Lay prices from a runner's prices list.
     Returns (best_back, best_lay).
     """
-    best_back = None
-    best_lay = None
-    for p in runner.get("prices", []):
-        side = p.get("side", "").lower()
-        odds = p.get("decimal-odds") or p.get("odds")
-        if not odds:
-            continue
-        if side == "back":
-            if best_back is None or odds > best_back:
-                best_back = odds
-        elif side == "lay":
-            if best_lay is None or odds < best_lay:
-                best_lay = odds
+    ladder = [
+        ((p.get("side") or "").lower(), p.get("decimal-odds") or p.get("odds"))
+        for p in runner.get("prices", ())
+    ]
+    best_back = max((odds for side, odds in ladder if side == "back" and odds), default=None)
+    best_lay = min((odds for side, odds in ladder if side == "lay" and odds), default=None)
     return best_back, best_lay
 
 
-def run_phase1(client: MatchbookClient, balance: float) -> None:
+@dataclass(frozen=True, slots=True)
+class RunnerView:
+    """The fields the phase logic reads from one runner, extracted once per fetch."""
+
+    id: int
+    name: Optional[str]
+    best_back: Optional[float]
+    best_lay: Optional[float]
+
+
+def build_runner_index(events: list[dict]) -> dict[tuple, RunnerView]:
+    """
+    Map (event_id, market_id, runner_id) -> RunnerView in one pass over the
+    events tree, so each runner's price ladder is scanned once per fetch
+    however many times the phase logic consults it. The index holds no
+    references into the raw payload, which can be freed once it is built.
+    Iteration order matches the events payload. Suspended markets are
+    skipped before their ladders are scanned: no offer can be placed there.
+    """
+    return {
+        (ev.get("id"), mkt.get("id"), r.get("id")): RunnerView(r.get("id"), r.get("name"), *get_best_prices(r))
+        for ev in events
+        for mkt in ev.get("markets", [])
+        if mkt.get("status") != "suspended"
+        for r in mkt.get("runners", [])
+    }
+
+
+def fetch_market_state(
+    client: MatchbookClient, offer_status: str, event_id_filter: Optional[str] = None
+) -> tuple[dict, dict]:
+    """
+    Fetch events with prices (optionally filtered to the dashboard's single
+    event) and our offers concurrently: one round-trip of wall time, not two.
+    Returns (events_data, offers_data); raises MatchbookAPIError.
+    """
+    events_future = _fetch_pool.submit(
+        client.get_events,
+        include_prices=True,
+        price_depth=3,
+        states="open,suspended",
+        per_page=10,
+        ids=event_id_filter,
+    )
+    offers_future = _fetch_pool.submit(client.get_offers, status=offer_status)
+    return events_future.result(), offers_future.result()
+
+
+def run_phase1(
+    client: MatchbookClient, balance: float, free_funds: float, events_data: dict, offers_data: dict
+) -> None:
     """
     Phase 1: Directional Scalping ("Buy the Dip").
     - Place Back orders at discount (best_back + 2 ticks)
     - When Back is matched, immediately place Lay to green up
     - Formula 1: Lay_Stake = (Back_Stake * Back_Odds) / Lay_Odds
+    events_data/offers_data: this cycle's fetch_market_state result.
     """
     # Pre-check: need funds to trade. Deposit at least £25 to start.
     if balance < config.MIN_STAKE:
@@ -88,40 +140,26 @@ def run_phase1(client: MatchbookClient, balance: float) -> None:
         )
         return
 
-    stake = get_stake(balance, 1)
-    account = client.get_account()
-    free_funds = float(account.get("free-funds", 0) or 0)
+    stake = stake_phase1(balance)
 
     # For Back orders we need free_funds >= stake
     can_place_back = free_funds >= stake
 
-    # Fetch events with prices (optionally filtered to single event)
-    event_id_filter = db.get_event_id()
-    try:
-        events_data = client.get_events(
-            include_prices=True,
-            price_depth=3,
-            states="open,suspended",
-            per_page=10,
-            ids=event_id_filter,
-        )
-    except MatchbookAPIError as e:
-        logger.error("Failed to fetch events: %s", e)
-        return
-
     events = events_data.get("events", [])
     if not events:
         logger.debug("No open events")
         return
 
-    # Check existing offers - if any Back is matched, place greening Lay
-    try:
-        offers_data = client.get_offers(status="matched")
-    except MatchbookAPIError as e:
-        logger.error("Failed to fetch offers: %s", e)
-        return
-
-    for offer in offers_data.get("offers", []):
+    offers = offers_data.get("offers", [])
+    runner_index = build_runner_index(events)
+
+    # Check existing offers - if any Back is matched, queue a greening Lay.
+    # All Lays for this cycle go out in a single submit_offers call.
+    pending_lays: List[dict] = []
+    # runner-id -> (event_id, market_id), to record the trades the batch returns
+    pending_runners: dict[int, tuple] = {}
+    committed_liability = 0.0
+    for offer in offers:
         if offer.get("side") != "back" or offer.get("status") != "matched":
             continue
         # We have a matched Back - need to green up with Lay
@@ -132,17 +170,8 @@ def run_phase1(client: MatchbookClient, balance: float) -> None:
         market_id = offer.get("market-id")
 
         # Find current best Lay price for this runner
-        best_lay = None
-        for ev in events:
-            if ev.get("id") != event_id:
-                continue
-            for mkt in ev.get("markets", []):
-                if mkt.get("id") != market_id:
-                    continue
-                for r in mkt.get("runners", []):
-                    if r.get("id") == runner_id:
-                        _, best_lay = get_best_prices(r)
-                        break
+        runner = runner_index.get((event_id, market_id, runner_id))
+        best_lay = runner.best_lay if runner else None
 
         if best_lay is None or best_lay <= 0:
             logger.warning("No Lay price for runner %s, skipping green up", runner_id)
@@ -153,37 +182,55 @@ def run_phase1(client: MatchbookClient, balance: float) -> None:
         if lay_stake < 0.5:
             continue
 
-        # Lay liability check: need free_funds >= Lay_Stake * (Lay_Odds - 1)
+        # Lay liability check: need free_funds to cover this Lay plus those already queued
         liability = lay_liability(lay_stake, best_lay)
-        if free_funds < liability:
+        if free_funds - committed_liability < liability:
             logger.warning(
                 "Insufficient funds for green-up Lay (need £%.2f, have £%.2f). Deposit funds.",
                 liability,
-                free_funds,
+                free_funds - committed_liability,
             )
             continue
 
+        committed_liability += liability
+        pending_lays.append(
+            {
+                "runner-id": runner_id,
+                "side": "lay",
+                "odds": best_lay,
+                "stake": round(lay_stake, 2),
+                "keep-in-play": False,
+            }
+        )
+        pending_runners[runner_id] = (event_id, market_id)
+
+    if pending_lays:
         try:
-            result = client.submit_offers(
-                offers=[
-                    {
-                        "runner-id": runner_id,
-                        "side": "lay",
-                        "odds": best_lay,
-                        "stake": round(lay_stake, 2),
-                        "keep-in-play": False,
-                    }
-                ]
-            )
-            for o in result.get("offers", []):
+            result = client.submit_offers(offers=pending_lays)
+            returned = result.get("offers", [])
+            if len(returned) != len(pending_lays):
+                logger.warning(
+                    "Green up: submitted %d Lays, response has %d offers", len(pending_lays), len(returned)
+                )
+            for o in returned:
+                # Odds and stake come from the returned offer itself: a runner can
+                # have several Lays in the batch, and the response order is not
+                # guaranteed. Only event/market, fixed per runner, come from the queue.
+                runner_id = o.get("runner-id")
+                if runner_id not in pending_runners:
+                    logger.warning("Green up response for unexpected runner %s: %s", runner_id, o)
+                    continue
+                event_id, market_id = pending_runners[runner_id]
+                lay_odds = o.get("decimal-odds") or o.get("odds")
+                lay_stake = o.get("stake")
                 if o.get("status") == "matched":
-                    logger.info("Greened up: Lay %.2f @ %.2f on runner %s", lay_stake, best_lay, runner_id)
+                    logger.info("Greened up: Lay %.2f @ %.2f on runner %s", lay_stake, lay_odds, runner_id)
                     db.record_trade(
                         event_id=event_id,
                         market_id=market_id,
                         runner_id=runner_id,
                         side="lay",
-                        odds=best_lay,
+                        odds=lay_odds,
                         stake=lay_stake,
                         matched_at=datetime.utcnow().isoformat(),
                         profit=None,
@@ -191,6 +238,10 @@ def run_phase1(client: MatchbookClient, balance: float) -> None:
                     )
                 elif o.get("status") == "failed":
                     logger.warning("Green up Lay failed: %s", o)
+        except MatchbookRateLimitError as e:
+            # Rate limited: place nothing more this cycle
+            logger.warning("Green up rate limited, skipping rest of cycle: %s", e)
+            return
         except MatchbookAPIError as e:
             logger.error("Green up failed: %s", e)
 
@@ -204,74 +255,66 @@ def run_phase1(client: MatchbookClient, balance: float) -> None:
         )
         return
 
-    placed_this_cycle = False
-    try:
-        open_offers = client.get_offers(status="open")
-        if len(open_offers.get("offers", [])) >= 2:
-            logger.debug("Already have open offers, skipping new Back")
-            return
-    except MatchbookAPIError:
-        pass
+    if sum(1 for o in offers if o.get("status") == "open") >= 2:
+        logger.debug("Already have open offers, skipping new Back")
+        return
 
-    for ev in events:
-        if placed_this_cycle:
-            break
-        for mkt in ev.get("markets", []):
-            if placed_this_cycle:
-                break
-            for r in mkt.get("runners", []):
-                best_back, best_lay = get_best_prices(r)
-                if best_back is None or best_lay is None:
-                    continue
-                # Avoid very short odds
-                if best_back < 1.5 or best_back > 10.0:
-                    continue
+    for r in runner_index.values():
+        best_back, best_lay = r.best_back, r.best_lay
+        if best_back is None or best_lay is None:
+            continue
+        if not config.MIN_BACK_ODDS_PHASE1 <= best_back <= config.MAX_BACK_ODDS_PHASE1:
+            continue
 
-                # Place Back at discount: best_back + TICKS_DISCOUNT ticks
-                back_odds = add_ticks_to_odds(best_back, config.TICKS_DISCOUNT, side="back")
-                if back_odds <= best_back:
-                    back_odds = add_ticks_to_odds(best_back, 1, side="back")
+        # Place Back at discount: best_back + TICKS_DISCOUNT ticks
+        back_odds = add_ticks_to_odds(best_back, config.TICKS_DISCOUNT, side="back")
+        if back_odds <= best_back:
+            back_odds = add_ticks_to_odds(best_back, 1, side="back")
 
-                try:
-                    result = client.submit_offers(
-                        offers=[
-                            {
-                                "runner-id": r["id"],
-                                "side": "back",
-                                "odds": back_odds,
-                                "stake": stake,
-                                "keep-in-play": False,
-                            }
-                        ]
+        try:
+            result = client.submit_offers(
+                offers=[
+                    {
+                        "runner-id": r.id,
+                        "side": "back",
+                        "odds": back_odds,
+                        "stake": stake,
+                        "keep-in-play": False,
+                    }
+                ]
+            )
+            for o in result.get("offers", []):
+                status = o.get("status")
+                if status in ("open", "matched", "delayed"):
+                    logger.info(
+                        "Phase 1 Back: %s @ %.2f stake %.2f (runner %s) - status %s",
+                        "back",
+                        back_odds,
+                        stake,
+                        r.name,
+                        status,
                     )
-                    for o in result.get("offers", []):
-                        status = o.get("status")
-                        if status in ("open", "matched", "delayed"):
-                            logger.info(
-                                "Phase 1 Back: %s @ %.2f stake %.2f (runner %s) - status %s",
-                                "back",
-                                back_odds,
-                                stake,
-                                r.get("name"),
-                                status,
-                            )
-                            placed_this_cycle = True
-                            break
-                        elif status == "failed":
-                            logger.warning("Back offer failed: %s", o)
-                except MatchbookAPIError as e:
-                    logger.error("Submit Back failed: %s", e)
-                if placed_this_cycle:
-                    break
+                    return  # One new Back per cycle
+                elif status == "failed":
+                    logger.warning("Back offer failed: %s", o)
+        except MatchbookRateLimitError as e:
+            # Rate limited: trying the next runner would only add to it
+            logger.warning("Submit Back rate limited, skipping rest of cycle: %s", e)
+            return
+        except MatchbookAPIError as e:
+            logger.error("Submit Back failed: %s", e)
 
 
-def run_phase2(client: MatchbookClient, balance: float) -> None:
+def run_phase2(
+    client: MatchbookClient, balance: float, free_funds: float, events_data: dict, offers_data: dict
+) -> None:
     """
     Phase 2: Market Making ("Trading the Spread").
     - Place Back at best Back, Lay at best Lay (edges of spread)
     - Formula 2: Lay_Liability = Lay_Stake * (Lay_Odds - 1)
     - Must verify free_funds >= Lay_Liability before placing Lay
     - If one side fills, cancel/adjust the other
+    events_data/offers_data: this cycle's fetch_market_state result.
     """
     # Pre-check: need sufficient funds for Phase 2 (Back + Lay liability)
     if balance < config.PHASE2_MIN:
@@ -282,35 +325,13 @@ def run_phase2(client: MatchbookClient, balance: float) -> None:
         )
         return
 
-    stake = get_stake(balance, 2)
-    account = client.get_account()
-    free_funds = float(account.get("free-funds", 0) or 0)
-
-    # Fetch events (optionally filtered to single event)
-    event_id_filter = db.get_event_id()
-    try:
-        events_data = client.get_events(
-            include_prices=True,
-            price_depth=3,
-            states="open,suspended",
-            per_page=10,
-            ids=event_id_filter,
-        )
-    except MatchbookAPIError as e:
-        logger.error("Failed to fetch events: %s", e)
-        return
+    stake = stake_phase2(balance)
 
     events = events_data.get("events", [])
     if not events:
         return
 
     # Check existing offers - if one side filled, cancel the other
-    try:
-        offers_data = client.get_offers(status="open,matched")
-    except MatchbookAPIError as e:
-        logger.error("Failed to fetch offers: %s", e)
-        return
-
     offers = offers_data.get("offers", [])
     matched_offer_ids = [o["id"] for o in offers if o.get("status") == "matched"]
     open_offer_ids = [o["id"] for o in offers if o.get("status") == "open"]
@@ -328,61 +349,87 @@ def run_phase2(client: MatchbookClient, balance: float) -> None:
         return
 
     # Find a market with a wide enough spread
-    for ev in events:
-        for mkt in ev.get("markets", []):
-            for r in mkt.get("runners", []):
-                best_back, best_lay = get_best_prices(r)
-                if best_back is None or best_lay is None:
-                    continue
-                spread = best_lay - best_back
-                if spread < 0.02:  # Need some spread to profit
-                    continue
-                if best_back < 1.2 or best_lay > 15.0:
-                    continue
+    for r in build_runner_index(events).values():
+        best_back, best_lay = r.best_back, r.best_lay
+        if best_back is None or best_lay is None:
+            continue
+        if best_back < config.MIN_BACK_ODDS_PHASE2 or best_lay > config.MAX_LAY_ODDS_PHASE2:
+            continue
+        if best_lay - best_back < config.MIN_SPREAD_PHASE2:
+            continue
 
-                # Formula 2: Lay_Liability = Lay_Stake * (Lay_Odds - 1)
-                liability = lay_liability(stake, best_lay)
-                if free_funds < liability:
-                    logger.warning(
-                        "Insufficient funds for Lay: need %.2f, have %.2f",
-                        liability,
-                        free_funds,
-                    )
-                    continue
+        # Formula 2: Lay_Liability = Lay_Stake * (Lay_Odds - 1)
+        liability = lay_liability(stake, best_lay)
+        if free_funds < liability:
+            logger.warning(
+                "Insufficient funds for Lay: need %.2f, have %.2f",
+                liability,
+                free_funds,
+            )
+            continue
 
-                # Place both Back and Lay
-                try:
-                    result = client.submit_offers(
-                        offers=[
-                            {
-                                "runner-id": r["id"],
-                                "side": "back",
-                                "odds": best_back,
-                                "stake": stake,
-                                "keep-in-play": False,
-                            },
-                            {
-                                "runner-id": r["id"],
-                                "side": "lay",
-                                "odds": best_lay,
-                                "stake": stake,
-                                "keep-in-play": False,
-                            },
-                        ]
-                    )
-                    for o in result.get("offers", []):
-                        logger.info(
-                            "Phase 2: %s @ %.2f stake %.2f (runner %s) - status %s",
-                            o.get("side"),
-                            o.get("decimal-odds", o.get("odds")),
-                            o.get("stake"),
-                            r.get("name"),
-                            o.get("status"),
-                        )
-                    return  # One market per cycle
-                except MatchbookAPIError as e:
-                    logger.error("Phase 2 submit failed: %s", e)
-                    return
+        # Place both Back and Lay
+        try:
+            result = client.submit_offers(
+                offers=[
+                    {
+                        "runner-id": r.id,
+                        "side": "back",
+                        "odds": best_back,
+                        "stake": stake,
+                        "keep-in-play": False,
+                    },
+                    {
+                        "runner-id": r.id,
+                        "side": "lay",
+                        "odds": best_lay,
+                        "stake": stake,
+                        "keep-in-play": False,
+                    },
+                ]
+            )
+            for o in result.get("offers", []):
+                logger.info(
+                    "Phase 2: %s @ %.2f stake %.2f (runner %s) - status %s",
+                    o.get("side"),
+                    o.get("decimal-odds", o.get("odds")),
+                    o.get("stake"),
+                    r.name,
+                    o.get("status"),
+                )
+            return  # One market per cycle
+        except MatchbookAPIError as e:
+            logger.error("Phase 2 submit failed: %s", e)
+            return
+
+
+def _bot_settings() -> tuple[bool, bool, Optional[str]]:
+    """Dashboard settings that change what a cycle does: (trading, force_phase1, event_id)."""
+    return db.is_trading_enabled(), db.is_force_phase1(), db.get_event_id()
+
+
+def wait_for_next_cycle(seen: Optional[tuple] = None) -> None:
+    """
+    Wait up to POLL_INTERVAL_SEC before the next cycle, returning early when
+    the dashboard changes a setting from `seen` (None: just wait).
+    The dashboard is another process, so settings are re-checked every
+    SETTINGS_POLL_SEC (a cached read) rather than signalled. If a check
+    fails (e.g. the database is locked), the rest of the interval is slept out.
+    """
+    deadline = time.monotonic() + config.POLL_INTERVAL_SEC
+    while (remaining := deadline - time.monotonic()) > 0:
+        time.sleep(min(config.SETTINGS_POLL_SEC, remaining))
+        if seen is None:
+            continue
+        try:
+            changed = _bot_settings() != seen
+        except Exception as e:
+            logger.warning("Settings check failed, waiting out the interval: %s", e)
+            seen = None
+            continue
+        if changed:
+            logger.info("Dashboard settings changed, starting next cycle")
+            break
 
 
 def main() -> None:
@@ -398,6 +445,7 @@ def main() -> None:
         return
 
     last_balance_refresh = 0.0
+    cycle_settings = None
 
     while True:
         try:
@@ -412,36 +460,52 @@ def main() -> None:
             account = client.get_account()
             balance = float(account.get("balance", 0) or 0)
             exposure = float(account.get("exposure", 0) or 0)
+            free_funds = float(account.get("free-funds", 0) or 0)
 
             phase = get_phase(balance)
 
+            # One timestamp per cycle, shared by every row this cycle writes
+            cycle_ts = datetime.utcnow().isoformat()
+            today = cycle_ts[:10]
+
             # Daily ROI: (balance - start_of_day) / start_of_day
-            daily_start = db.get_daily_start_balance()
+            daily_start = db.get_daily_start_balance(today)
             if daily_start and daily_start > 0:
                 daily_roi = (balance - daily_start) / daily_start
             else:
-                db.update_daily_start(datetime.utcnow().strftime("%Y-%m-%d"), balance)
+                db.update_daily_start(today, balance)
                 daily_roi = 0.0
 
-            db.record_bankroll_snapshot(balance, phase, daily_roi)
+            db.record_bankroll_snapshot(balance, phase, daily_roi, timestamp=cycle_ts)
 
+            # Read the dashboard settings once per cycle; a change ends the next wait early
+            cycle_settings = _bot_settings()
+            trading_enabled, force_phase1, event_id_filter = cycle_settings
             logger.info(
                 "Balance=£%.2f Exposure=£%.2f Phase=%s DailyROI=%.2f%% Trading=%s",
                 balance,
                 exposure,
                 phase,
                 daily_roi * 100,
-                "ON" if db.is_trading_enabled() else "OFF",
+                "ON" if trading_enabled else "OFF",
             )
 
             # Only place orders when trading is enabled via dashboard
             # Phase: respect Force Phase 1 setting, else use balance-based phase
-            if db.is_trading_enabled():
-                effective_phase = 1 if db.is_force_phase1() else phase
-                if effective_phase == 1:
-                    run_phase1(client, balance)
+            if trading_enabled:
+                effective_phase = 1 if force_phase1 else phase
+                # Events plus open and matched offers, fetched once for whichever
+                # phase runs: Phase 1 greens up matched Backs and gates new Backs
+                # on the open count; Phase 2 cancels counterparts of filled sides
+                try:
+                    events_data, offers_data = fetch_market_state(client, "open,matched", event_id_filter)
+                except MatchbookAPIError as e:
+                    logger.error("Failed to fetch events/offers: %s", e)
                 else:
-                    run_phase2(client, balance)
+                    if effective_phase == 1:
+                        run_phase1(client, balance, free_funds, events_data, offers_data)
+                    else:
+                        run_phase2(client, balance, free_funds, events_data, offers_data)
             else:
                 logger.debug("Trading disabled - skipping order placement")
 
@@ -450,7 +514,7 @@ def main() -> None:
         except Exception as e:
             logger.exception("Unexpected error: %s", e)
 
-        time.sleep(config.POLL_INTERVAL_SEC)
+        wait_for_next_cycle(cycle_settings)
 
 
 if __name__ == "__main__":
@@ -16,14 +16,20 @@ TICKS_DISCOUNT = 2  # Place Back at best_back + 2 ticks
 STAKE_PCT_PHASE1 = 0.03  # 3% of bankroll per Back order
 MIN_STAKE = 1.0
 MAX_STAKE_PHASE1 = 5.0
+MIN_BACK_ODDS_PHASE1 = 1.5  # Avoid very short odds
+MAX_BACK_ODDS_PHASE1 = 10.0
 
 # Phase 2: Market Making
 STAKE_PCT_PHASE2 = 0.02  # 2% of bankroll per side
 MAX_STAKE_PHASE2 = 20.0
+MIN_SPREAD_PHASE2 = 0.02  # Need some spread to profit
+MIN_BACK_ODDS_PHASE2 = 1.2
+MAX_LAY_ODDS_PHASE2 = 15.0
 
 # Risk management
 STOP_LOSS_PCT = 0.10  # 10% adverse move triggers stop
 POLL_INTERVAL_SEC = 45
+SETTINGS_POLL_SEC = 2  # While idle, check this often for dashboard setting changes
 BALANCE_REFRESH_INTERVAL_SEC = 300  # Re-login every 5 min to refresh balance
 
 # Market filters (empty = trade all)
@@ -4,7 +4,10 @@ Stores trade history, active positions, and bankroll snapshots for analytics.
 """
 
 import sqlite3
-from datetime import datetime
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
 from pathlib import Path
 from typing import Optional
 
@@ -14,11 +17,63 @@ DB_PATH = Path(__file__).parent / "trading.db"
 # Starting bankroll for first-run seed
 STARTING_BANKROLL = 25.0
 
+# Dashboard auto-refresh interval when none is stored
+DEFAULT_REFRESH_INTERVAL = 30
+
+# Settings change only on dashboard clicks; getters share one SELECT for this long
+SETTINGS_CACHE_TTL_SEC = 2.0
+
+# Bankroll snapshots older than this are pruned; checked every N inserts
+SNAPSHOT_RETENTION_DAYS = 90
+SNAPSHOT_PRUNE_EVERY = 100
+
+
+@dataclass
+class DashboardState:
+    """Everything the dashboard reads from SQLite for one render."""
+
+    trading_enabled: bool
+    event_id: Optional[str]
+    force_phase1: bool
+    refresh_interval: int
+    last_snapshot_time: Optional[str]
+    latest_balance: Optional[float]
+    daily_start_balance: Optional[float]
+    trades: list[dict]
+    pnl_dates: tuple[str, ...]
+    pnl_values: tuple[float, ...]
+
+
+# One connection per thread, opened on first use and reused afterwards
+_local = threading.local()
+
+# Last settings read as {key: value}, and when it was taken (monotonic)
+_settings_cache: dict[str, str] = {}
+_settings_cache_ts: Optional[float] = None
+
+# Snapshot inserts since the last retention prune (per process)
+_snapshots_since_prune = 0
+
 
 def get_connection() -> sqlite3.Connection:
-    """Return a connection to the SQLite database."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row  # Return dict-like rows
+    """
+    Return this thread's connection to the SQLite database.
+    Connections are kept open (no per-call connect/close); a new one is
+    opened if DB_PATH changes. Every helper commits its own writes, so a
+    transaction still open here was abandoned by a failed call: roll it back.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.path != DB_PATH:
+        conn = sqlite3.connect(DB_PATH)
+        conn.row_factory = sqlite3.Row  # Return dict-like rows
+        # Under WAL, NORMAL only fsyncs at checkpoints, not on every commit
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        # ~20 MB page cache: the connection lives for the process, so hot pages stay resident
+        conn.execute("PRAGMA cache_size=-20000")
+        _local.conn, _local.path = conn, DB_PATH
+    elif conn.in_transaction:
+        conn.rollback()
     return conn
 
 
@@ -28,96 +83,126 @@ def init_db() -> None:
     On first run with empty DB, seeds bankroll_snapshots with starting £25.
     """
     conn = get_connection()
-    try:
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS bankroll_snapshots (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT NOT NULL,
-                balance REAL NOT NULL,
-                phase INTEGER NOT NULL,
-                daily_roi REAL
-            )
-        """)
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS trades (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                event_id INTEGER,
-                market_id INTEGER,
-                runner_id INTEGER,
-                side TEXT NOT NULL,
-                odds REAL NOT NULL,
-                stake REAL NOT NULL,
-                matched_at TEXT NOT NULL,
-                profit REAL,
-                phase INTEGER
-            )
-        """)
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS positions (
-                offer_id INTEGER PRIMARY KEY,
-                event_id INTEGER,
-                market_name TEXT,
-                selection TEXT,
-                side TEXT NOT NULL,
-                odds REAL NOT NULL,
-                stake REAL NOT NULL,
-                status TEXT NOT NULL,
-                created_at TEXT NOT NULL
-            )
-        """)
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS daily_start (
-                id INTEGER PRIMARY KEY CHECK (id = 1),
-                date TEXT NOT NULL,
-                balance REAL NOT NULL
-            )
-        """)
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS settings (
-                key TEXT PRIMARY KEY,
-                value TEXT NOT NULL
-            )
-        """)
-        conn.commit()
-
-        # Default: trading disabled until user enables via dashboard
+    # Persistent per database file: readers (dashboard) no longer block the bot's writes
+    conn.execute("PRAGMA journal_mode=WAL")
+    # Schema, defaults and first-run seed in one transaction: a single commit
+    conn.execute("BEGIN")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS bankroll_snapshots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            balance REAL NOT NULL,
+            phase INTEGER NOT NULL,
+            daily_roi REAL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS trades (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_id INTEGER,
+            market_id INTEGER,
+            runner_id INTEGER,
+            side TEXT NOT NULL,
+            odds REAL NOT NULL,
+            stake REAL NOT NULL,
+            matched_at TEXT NOT NULL,
+            profit REAL,
+            phase INTEGER
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS positions (
+            offer_id INTEGER PRIMARY KEY,
+            event_id INTEGER,
+            market_name TEXT,
+            selection TEXT,
+            side TEXT NOT NULL,
+            odds REAL NOT NULL,
+            stake REAL NOT NULL,
+            status TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS daily_start (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            date TEXT NOT NULL,
+            balance REAL NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )
+    """)
+    # Equity curve, latest-snapshot and trade-history reads all order by time
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_snap_ts ON bankroll_snapshots(timestamp)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_trades_matched_at ON trades(matched_at)")
+
+    # Default: trading disabled until user enables via dashboard
+    conn.execute(
+        "INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)",
+        ("trading_enabled", "0"),
+    )
+
+    # Seed bankroll_snapshots if empty (first run)
+    cursor = conn.execute("SELECT COUNT(*) FROM bankroll_snapshots")
+    if cursor.fetchone()[0] == 0:
+        now = datetime.utcnow().isoformat()
         conn.execute(
-            "INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)",
-            ("trading_enabled", "0"),
+            "INSERT INTO bankroll_snapshots (timestamp, balance, phase, daily_roi) VALUES (?, ?, ?, ?)",
+            (now, STARTING_BANKROLL, 1, 0.0),
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO daily_start (id, date, balance) VALUES (1, ?, ?)",
+            (now[:10], STARTING_BANKROLL),
         )
-        conn.commit()
-
-        # Seed bankroll_snapshots if empty (first run)
-        cursor = conn.execute("SELECT COUNT(*) FROM bankroll_snapshots")
-        if cursor.fetchone()[0] == 0:
-            now = datetime.utcnow().isoformat()
-            conn.execute(
-                "INSERT INTO bankroll_snapshots (timestamp, balance, phase, daily_roi) VALUES (?, ?, ?, ?)",
-                (now, STARTING_BANKROLL, 1, 0.0),
-            )
-            conn.execute(
-                "INSERT OR REPLACE INTO daily_start (id, date, balance) VALUES (1, ?, ?)",
-                (now[:10], STARTING_BANKROLL),
-            )
-            conn.commit()
-    finally:
-        conn.close()
-
-
-def record_bankroll_snapshot(balance: float, phase: int, daily_roi: Optional[float] = None) -> None:
+    conn.commit()
+
+
+def record_bankroll_snapshot(
+    balance: float,
+    phase: int,
+    daily_roi: Optional[float] = None,
+    timestamp: Optional[str] = None,
+) -> None:
     """
     Record a bankroll snapshot for the equity curve.
     Called by the bot on each loop iteration.
+    timestamp: ISO UTC time of the snapshot; defaults to now.
+    Every SNAPSHOT_PRUNE_EVERY inserts, snapshots older than
+    SNAPSHOT_RETENTION_DAYS are deleted so the table stays bounded.
     """
+    global _snapshots_since_prune
     conn = get_connection()
-    try:
-        conn.execute(
-            "INSERT INTO bankroll_snapshots (timestamp, balance, phase, daily_roi) VALUES (?, ?, ?, ?)",
-            (datetime.utcnow().isoformat(), balance, phase, daily_roi),
-        )
-        conn.commit()
-    finally:
-        conn.close()
+    conn.execute(
+        "INSERT INTO bankroll_snapshots (timestamp, balance, phase, daily_roi) VALUES (?, ?, ?, ?)",
+        (timestamp or datetime.utcnow().isoformat(), balance, phase, daily_roi),
+    )
+    _snapshots_since_prune += 1
+    if _snapshots_since_prune >= SNAPSHOT_PRUNE_EVERY:
+        _snapshots_since_prune = 0
+        _prune_bankroll_snapshots(conn)
+    conn.commit()
+
+
+def prune_bankroll_snapshots() -> int:
+    """
+    Delete bankroll snapshots older than SNAPSHOT_RETENTION_DAYS.
+    No VACUUM: freed pages are reused by later inserts.
+    Returns the number of rows deleted.
+    """
+    conn = get_connection()
+    deleted = _prune_bankroll_snapshots(conn)
+    conn.commit()
+    return deleted
+
+
+def _prune_bankroll_snapshots(conn: sqlite3.Connection) -> int:
+    cutoff = (datetime.utcnow() - timedelta(days=SNAPSHOT_RETENTION_DAYS)).isoformat()
+    cursor = conn.execute("DELETE FROM bankroll_snapshots WHERE timestamp < ?", (cutoff,))
+    return cursor.rowcount
 
 
 def record_trade(
@@ -133,118 +218,99 @@ def record_trade(
 ) -> None:
     """Insert a completed trade into the trades table."""
     conn = get_connection()
-    try:
-        conn.execute(
-            """INSERT INTO trades (event_id, market_id, runner_id, side, odds, stake, matched_at, profit, phase)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-            (event_id, market_id, runner_id, side, odds, stake, matched_at, profit, phase),
-        )
-        conn.commit()
-    finally:
-        conn.close()
+    conn.execute(
+        """INSERT INTO trades (event_id, market_id, runner_id, side, odds, stake, matched_at, profit, phase)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        (event_id, market_id, runner_id, side, odds, stake, matched_at, profit, phase),
+    )
+    conn.commit()
 
 
-def get_equity_curve() -> tuple[list[str], list[float]]:
+def get_equity_curve() -> tuple[tuple[str, ...], tuple[float, ...]]:
     """
-    Return (timestamps, balances) for Plotly equity chart.
+    Return (timestamps, balances) for Plotly equity chart, oldest first.
     """
     conn = get_connection()
-    try:
-        cursor = conn.execute(
-            "SELECT timestamp, balance FROM bankroll_snapshots ORDER BY timestamp"
-        )
-        rows = cursor.fetchall()
-        timestamps = [row["timestamp"] for row in rows]
-        balances = [row["balance"] for row in rows]
-        return timestamps, balances
-    finally:
-        conn.close()
+    return _query_equity_curve(conn)
+
+
+def _query_equity_curve(conn: sqlite3.Connection) -> tuple[tuple[str, ...], tuple[float, ...]]:
+    rows = conn.execute(
+        "SELECT timestamp, balance FROM bankroll_snapshots ORDER BY timestamp"
+    ).fetchall()
+    if not rows:
+        return (), ()
+    timestamps, balances = zip(*rows)
+    return timestamps, balances
 
 
 def get_trades(limit: int = 50) -> list[dict]:
     """Return recent trades for the trade history table."""
     conn = get_connection()
-    try:
-        cursor = conn.execute(
-            """SELECT id, event_id, market_id, runner_id, side, odds, stake, matched_at, profit, phase
-               FROM trades ORDER BY matched_at DESC LIMIT ?""",
-            (limit,),
-        )
-        return [dict(row) for row in cursor.fetchall()]
-    finally:
-        conn.close()
+    return _query_trades(conn, limit)
+
+
+def _query_trades(conn: sqlite3.Connection, limit: int) -> list[dict]:
+    cursor = conn.execute(
+        """SELECT id, event_id, market_id, runner_id, side, odds, stake, matched_at, profit, phase
+           FROM trades ORDER BY matched_at DESC LIMIT ?""",
+        (limit,),
+    )
+    return [dict(row) for row in cursor.fetchall()]
 
 
 def get_last_snapshot_time() -> Optional[str]:
     """Return timestamp of last bankroll snapshot (for bot status)."""
     conn = get_connection()
-    try:
-        cursor = conn.execute(
-            "SELECT timestamp FROM bankroll_snapshots ORDER BY timestamp DESC LIMIT 1"
-        )
-        row = cursor.fetchone()
-        return row["timestamp"] if row else None
-    finally:
-        conn.close()
+    cursor = conn.execute(
+        "SELECT timestamp FROM bankroll_snapshots ORDER BY timestamp DESC LIMIT 1"
+    )
+    row = cursor.fetchone()
+    return row["timestamp"] if row else None
 
 
-def get_daily_pnl(limit_days: int = 30) -> list[tuple[str, float]]:
+def get_daily_pnl(limit_days: int = 30) -> tuple[tuple[str, ...], tuple[float, ...]]:
     """
-    Return [(date, pnl), ...] for daily P&L chart.
+    Return (dates, pnls) for the daily P&L chart, oldest first,
+    covering the most recent limit_days days that have snapshots.
     P&L = last balance of day - first balance of day.
     """
     conn = get_connection()
-    try:
-        cursor = conn.execute(
-            "SELECT timestamp, balance FROM bankroll_snapshots ORDER BY timestamp"
-        )
-        rows = cursor.fetchall()
-        by_day = {}
-        for row in rows:
-            day = row["timestamp"][:10]
-            bal = row["balance"]
-            if day not in by_day:
-                by_day[day] = {"first": bal, "last": bal}
-            by_day[day]["last"] = bal
-        result = [(day, by_day[day]["last"] - by_day[day]["first"]) for day in sorted(by_day.keys(), reverse=True)]
-        return result[:limit_days]
-    finally:
-        conn.close()
+    return _query_daily_pnl(conn, limit_days)
+
+
+def _query_daily_pnl(conn: sqlite3.Connection, limit_days: int) -> tuple[tuple[str, ...], tuple[float, ...]]:
+    # First/last balance per day via window functions; SQLite does the grouping and sort
+    rows = conn.execute(
+        """SELECT day, pnl FROM (
+               SELECT DISTINCT substr(timestamp, 1, 10) AS day,
+                      LAST_VALUE(balance) OVER day_window - FIRST_VALUE(balance) OVER day_window AS pnl
+               FROM bankroll_snapshots
+               WINDOW day_window AS (
+                   PARTITION BY substr(timestamp, 1, 10) ORDER BY timestamp
+                   ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING
+               )
+               ORDER BY day DESC LIMIT ?
+           ) ORDER BY day""",
+        (limit_days,),
+    ).fetchall()
+    if not rows:
+        return (), ()
+    dates, pnls = zip(*rows)
+    return dates, pnls
 
 
 def get_refresh_interval() -> int:
     """Return refresh interval in seconds. Default 30."""
     try:
-        conn = get_connection()
-        try:
-            cursor = conn.execute(
-                "SELECT value FROM settings WHERE key = ?", ("refresh_interval",)
-            )
-            row = cursor.fetchone()
-            if row and row["value"]:
-                return int(row["value"])
-            return 30
-        finally:
-            conn.close()
-    except (sqlite3.OperationalError, ValueError):
-        return 30
+        return int(_load_settings().get("refresh_interval") or DEFAULT_REFRESH_INTERVAL)
+    except ValueError:
+        return DEFAULT_REFRESH_INTERVAL
 
 
 def set_refresh_interval(seconds: int) -> None:
     """Set refresh interval in seconds."""
-    try:
-        conn = get_connection()
-        try:
-            conn.execute(
-                "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
-                ("refresh_interval", str(max(10, min(300, seconds)))),
-            )
-            conn.commit()
-        finally:
-            conn.close()
-    except sqlite3.OperationalError:
-        _ensure_settings_table()
-        set_refresh_interval(seconds)
+    _put_setting("refresh_interval", str(max(10, min(300, seconds))))
 
 
 def upsert_position(
@@ -256,218 +322,208 @@ def upsert_position(
     odds: float,
     stake: float,
     status: str,
+    created_at: Optional[str] = None,
 ) -> None:
-    """Insert or update a position (sync with API offers)."""
+    """Insert or update a position (sync with API offers). created_at defaults to now."""
     conn = get_connection()
-    try:
-        conn.execute(
-            """INSERT OR REPLACE INTO positions (offer_id, event_id, market_name, selection, side, odds, stake, status, created_at)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-            (
-                offer_id,
-                event_id,
-                market_name,
-                selection,
-                side,
-                odds,
-                stake,
-                status,
-                datetime.utcnow().isoformat(),
-            ),
-        )
-        conn.commit()
-    finally:
-        conn.close()
+    conn.execute(
+        """INSERT OR REPLACE INTO positions (offer_id, event_id, market_name, selection, side, odds, stake, status, created_at)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        (
+            offer_id,
+            event_id,
+            market_name,
+            selection,
+            side,
+            odds,
+            stake,
+            status,
+            created_at or datetime.utcnow().isoformat(),
+        ),
+    )
+    conn.commit()
 
 
 def remove_position(offer_id: int) -> None:
     """Remove a position from the positions table."""
     conn = get_connection()
-    try:
-        conn.execute("DELETE FROM positions WHERE offer_id = ?", (offer_id,))
-        conn.commit()
-    finally:
-        conn.close()
+    conn.execute("DELETE FROM positions WHERE offer_id = ?", (offer_id,))
+    conn.commit()
 
 
 def get_latest_balance() -> Optional[float]:
     """Return the most recent balance from bankroll_snapshots."""
     conn = get_connection()
-    try:
-        cursor = conn.execute(
-            "SELECT balance FROM bankroll_snapshots ORDER BY timestamp DESC LIMIT 1"
-        )
-        row = cursor.fetchone()
-        return row["balance"] if row else None
-    finally:
-        conn.close()
+    cursor = conn.execute(
+        "SELECT balance FROM bankroll_snapshots ORDER BY timestamp DESC LIMIT 1"
+    )
+    row = cursor.fetchone()
+    return row["balance"] if row else None
 
 
-def get_daily_start_balance() -> Optional[float]:
-    """Return the balance at start of current day (for daily ROI calc)."""
+def get_daily_start_balance(today: Optional[str] = None) -> Optional[float]:
+    """
+    Return the balance at start of current day (for daily ROI calc).
+    today: UTC date as YYYY-MM-DD; defaults to the current date.
+    """
     conn = get_connection()
-    try:
-        today = datetime.utcnow().strftime("%Y-%m-%d")
-        cursor = conn.execute(
-            "SELECT balance FROM daily_start WHERE date = ? ORDER BY id DESC LIMIT 1",
-            (today,),
-        )
-        row = cursor.fetchone()
-        if row:
-            return row["balance"]
-        # Fallback: first snapshot of today
-        cursor = conn.execute(
-            "SELECT balance FROM bankroll_snapshots WHERE timestamp LIKE ? ORDER BY timestamp ASC LIMIT 1",
-            (f"{today}%",),
-        )
-        row = cursor.fetchone()
-        return row["balance"] if row else None
-    finally:
-        conn.close()
+    return _query_daily_start_balance(conn, today)
+
+
+def _query_daily_start_balance(conn: sqlite3.Connection, today: Optional[str] = None) -> Optional[float]:
+    today = today or datetime.utcnow().strftime("%Y-%m-%d")
+    cursor = conn.execute(
+        "SELECT balance FROM daily_start WHERE date = ? ORDER BY id DESC LIMIT 1",
+        (today,),
+    )
+    row = cursor.fetchone()
+    if row:
+        return row["balance"]
+    # Fallback: first snapshot of today (range on the timestamp index)
+    tomorrow = (date.fromisoformat(today) + timedelta(days=1)).isoformat()
+    cursor = conn.execute(
+        "SELECT balance FROM bankroll_snapshots WHERE timestamp >= ? AND timestamp < ? ORDER BY timestamp ASC LIMIT 1",
+        (today, tomorrow),
+    )
+    row = cursor.fetchone()
+    return row["balance"] if row else None
 
 
 def update_daily_start(date: str, balance: float) -> None:
     """Update the daily start balance for the given date."""
     conn = get_connection()
-    try:
-        conn.execute(
-            "INSERT OR REPLACE INTO daily_start (id, date, balance) VALUES (1, ?, ?)",
-            (date, balance),
-        )
-        conn.commit()
-    finally:
-        conn.close()
+    conn.execute(
+        "INSERT OR REPLACE INTO daily_start (id, date, balance) VALUES (1, ?, ?)",
+        (date, balance),
+    )
+    conn.commit()
 
 
 def clear_positions() -> None:
     """Clear all positions (e.g. after sync with API)."""
     conn = get_connection()
-    try:
-        conn.execute("DELETE FROM positions")
-        conn.commit()
-    finally:
-        conn.close()
+    conn.execute("DELETE FROM positions")
+    conn.commit()
 
 
 def _ensure_settings_table() -> None:
     """Create settings table if missing (migration for existing DBs)."""
     conn = get_connection()
-    try:
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS settings (
-                key TEXT PRIMARY KEY,
-                value TEXT NOT NULL
-            )
-        """)
-        conn.execute(
-            "INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)",
-            ("trading_enabled", "0"),
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
         )
-        conn.commit()
-    finally:
-        conn.close()
+    """)
+    conn.execute(
+        "INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)",
+        ("trading_enabled", "0"),
+    )
+    conn.commit()
+
+
+def _load_settings() -> dict[str, str]:
+    """
+    Return all settings as {key: value} from a single SELECT, re-read at
+    most every SETTINGS_CACHE_TTL_SEC. Setters in this process invalidate it;
+    writes from the other process (bot vs dashboard) show up within the TTL.
+    If the read fails (e.g. the database is locked), the last settings read
+    are returned, or {} (every getter's default) if there are none yet.
+    """
+    global _settings_cache, _settings_cache_ts
+    now = time.monotonic()
+    if _settings_cache_ts is None or now - _settings_cache_ts >= SETTINGS_CACHE_TTL_SEC:
+        try:
+            rows = get_connection().execute("SELECT key, value FROM settings").fetchall()
+        except sqlite3.OperationalError as e:
+            if "no such table" not in str(e):
+                return _settings_cache
+            _ensure_settings_table()
+            rows = get_connection().execute("SELECT key, value FROM settings").fetchall()
+        _settings_cache = dict(rows)
+        _settings_cache_ts = now
+    return _settings_cache
+
+
+def _invalidate_settings() -> None:
+    """Force the next settings getter to re-read the table."""
+    global _settings_cache_ts
+    _settings_cache_ts = None
+
+
+def _put_setting(key: str, value: str) -> None:
+    """Write one setting in place and invalidate the settings cache. init_db creates the table."""
+    conn = get_connection()
+    conn.execute(
+        "INSERT INTO settings (key, value) VALUES (?, ?) "
+        "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        (key, value),
+    )
+    conn.commit()
+    _invalidate_settings()
 
 
 def is_trading_enabled() -> bool:
     """Return True if trading is enabled via dashboard. Default False."""
-    try:
-        conn = get_connection()
-        try:
-            cursor = conn.execute(
-                "SELECT value FROM settings WHERE key = ?", ("trading_enabled",)
-            )
-            row = cursor.fetchone()
-            return row and row["value"] == "1"
-        finally:
-            conn.close()
-    except sqlite3.OperationalError:
-        _ensure_settings_table()
-        return False
+    return _load_settings().get("trading_enabled") == "1"
 
 
 def set_trading_enabled(enabled: bool) -> None:
     """Enable or disable trading. Bot only places orders when enabled."""
-    try:
-        conn = get_connection()
-        try:
-            conn.execute(
-                "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
-                ("trading_enabled", "1" if enabled else "0"),
-            )
-            conn.commit()
-        finally:
-            conn.close()
-    except sqlite3.OperationalError:
-        _ensure_settings_table()
-        set_trading_enabled(enabled)  # Retry
+    _put_setting("trading_enabled", "1" if enabled else "0")
 
 
 def get_event_id() -> Optional[str]:
     """Return the event ID to focus on, or None for all events."""
-    try:
-        conn = get_connection()
-        try:
-            cursor = conn.execute(
-                "SELECT value FROM settings WHERE key = ?", ("event_id",)
-            )
-            row = cursor.fetchone()
-            if row and row["value"]:
-                return row["value"]
-            return None
-        finally:
-            conn.close()
-    except sqlite3.OperationalError:
-        _ensure_settings_table()
-        return None
+    return _load_settings().get("event_id") or None
 
 
 def set_event_id(event_id: str) -> None:
     """Set the event ID to focus on. Empty string = all events."""
-    try:
-        conn = get_connection()
-        try:
-            conn.execute(
-                "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
-                ("event_id", event_id.strip() if event_id else ""),
-            )
-            conn.commit()
-        finally:
-            conn.close()
-    except sqlite3.OperationalError:
-        _ensure_settings_table()
-        set_event_id(event_id)  # Retry
+    _put_setting("event_id", event_id.strip() if event_id else "")
 
 
 def is_force_phase1() -> bool:
     """Return True if Phase 1 is forced (ignore balance for phase selection). Default True."""
-    try:
-        conn = get_connection()
-        try:
-            cursor = conn.execute(
-                "SELECT value FROM settings WHERE key = ?", ("force_phase1",)
-            )
-            row = cursor.fetchone()
-            # Default True: start with Phase 1 until user switches
-            return row is None or row["value"] == "1"
-        finally:
-            conn.close()
-    except sqlite3.OperationalError:
-        _ensure_settings_table()
-        return True
+    # Default True: start with Phase 1 until user switches
+    return _load_settings().get("force_phase1", "1") == "1"
 
 
 def set_force_phase1(force: bool) -> None:
     """Force Phase 1 (True) or use balance-based phase (False)."""
+    _put_setting("force_phase1", "1" if force else "0")
+
+
+def get_dashboard_state(trades_limit: int = 50, pnl_days: int = 14) -> DashboardState:
+    """
+    Read settings, latest snapshot, trades and daily P&L on one connection
+    inside one read transaction, so a dashboard render opens SQLite once
+    and sees a consistent view. The equity curve grows without bound and is
+    read separately via get_equity_curve().
+    """
+    conn = get_connection()
+    conn.execute("BEGIN")
+    settings = dict(conn.execute("SELECT key, value FROM settings").fetchall())
     try:
-        conn = get_connection()
-        try:
-            conn.execute(
-                "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
-                ("force_phase1", "1" if force else "0"),
-            )
-            conn.commit()
-        finally:
-            conn.close()
-    except sqlite3.OperationalError:
-        _ensure_settings_table()
-        set_force_phase1(force)  # Retry
+        refresh_interval = int(settings.get("refresh_interval") or DEFAULT_REFRESH_INTERVAL)
+    except ValueError:
+        refresh_interval = DEFAULT_REFRESH_INTERVAL
+    last = conn.execute(
+        "SELECT timestamp, balance FROM bankroll_snapshots ORDER BY timestamp DESC LIMIT 1"
+    ).fetchone()
+    pnl_dates, pnl_values = _query_daily_pnl(conn, pnl_days)
+    state = DashboardState(
+        trading_enabled=settings.get("trading_enabled") == "1",
+        event_id=settings.get("event_id") or None,
+        # Default True: start with Phase 1 until user switches
+        force_phase1=settings.get("force_phase1", "1") == "1",
+        refresh_interval=refresh_interval,
+        last_snapshot_time=last["timestamp"] if last else None,
+        latest_balance=last["balance"] if last else None,
+        daily_start_balance=_query_daily_start_balance(conn),
+        trades=_query_trades(conn, trades_limit),
+        pnl_dates=pnl_dates,
+        pnl_values=pnl_values,
+    )
+    conn.commit()
+    return state
@@ -4,21 +4,49 @@ Handles authentication, session refresh, market data, and order placement/cancel
 Credentials loaded from .env via python-dotenv.
 """
 
+import bisect
+import functools
+import json
 import logging
+import random
+import threading
 import time
-from typing import Any, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterator, Optional, Union
 
 import os
 from pathlib import Path
 
 import requests
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 
+# Optional faster JSON codec; the stdlib json module is used when it is missing
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Load .env from project root (where this file lives)
 load_dotenv(Path(__file__).parent / ".env")
 
 logger = logging.getLogger(__name__)
 
+
+def _dumps(obj: Any) -> bytes:
+    """Encode a request body as compact JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def _loads(content: bytes) -> Any:
+    """Decode a JSON response body."""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
 BASE_URL = "https://api.matchbook.com"
 SESSION_ENDPOINT = "/bpapi/rest/security/session"
 EVENTS_ENDPOINT = "/edge/rest/events"
@@ -27,14 +55,42 @@ OFFERS_ENDPOINT = "/edge/rest/v2/offers"
 # Request timeouts and retry config
 REQUEST_TIMEOUT = 30
 MAX_RETRIES = 3
-RETRY_BACKOFF_BASE = 2  # seconds for exponential backoff
+RETRY_BACKOFF_BASE = 1.0  # seconds; network-retry window doubles per attempt
 RATE_LIMIT_BACKOFF = 60  # seconds when 429 received
+MAX_BACKOFF = 30  # cap on a single jittered retry sleep
+ORDER_DEADLINE_SEC = 2.0  # order calls give up rather than back off past this
+EVENTS_CACHE_TTL = 1.0  # seconds an events response is reused without revalidating
+ETAG_CACHE_MAX_ENTRIES = 16  # distinct (path, params) responses kept; least recently used go first
+MAX_CONCURRENT_REQUESTS = 4  # in-flight requests per client (shared by dashboard sessions)
+POOL_MAXSIZE = 10  # keep-alive connections kept open per host
+# Gateway errors retried inside the transport. GET only: a retried POST could
+# place an order twice, and order calls (POST/DELETE) are bounded by a deadline
+# that only _request can enforce. 429s and network errors stay in _request;
+# Retry-After is ignored here, or urllib3 would also retry 413/429/503
+# responses carrying it and sleep for the uncapped server value.
+GATEWAY_RETRY = Retry(
+    total=MAX_RETRIES,
+    connect=0,
+    read=0,
+    other=0,
+    status=MAX_RETRIES,
+    status_forcelist=(502, 503, 504),
+    allowed_methods=frozenset({"GET"}),
+    backoff_factor=0.5,
+    respect_retry_after_header=False,
+    raise_on_status=False,
+)
 
 
 class MatchbookAPIError(Exception):
-    """Base exception for Matchbook API errors."""
+    """
+    Base exception for Matchbook API errors.
+    status_code: HTTP status of the failing response; None for transport failures.
+    """
 
-    pass
+    def __init__(self, message: str = "", status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
 
 
 class MatchbookAuthError(MatchbookAPIError):
@@ -49,13 +105,51 @@ class MatchbookRateLimitError(MatchbookAPIError):
     pass
 
 
+def _backoff(attempt: int, base: float, cap: float = MAX_BACKOFF) -> float:
+    """Full-jitter backoff: uniform in [0, min(cap, base * 2**attempt)] so retrying clients spread out."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def _retry_after(resp: requests.Response) -> Optional[float]:
+    """Seconds from a numeric Retry-After header, capped at RATE_LIMIT_BACKOFF; None if absent."""
+    try:
+        return min(max(float(resp.headers["Retry-After"]), 0.0), RATE_LIMIT_BACKOFF)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+# Envelope of a submit_offers body with the default odds/exchange types;
+# only the offers list is encoded per call
+_SUBMIT_PREFIX = b'{"odds-type":"DECIMAL","exchange-type":"back-lay","offers":'
+
+
+def _deadline(max_wait: Optional[float]) -> Optional[float]:
+    """Monotonic deadline max_wait seconds from now, or None for no limit."""
+    return None if max_wait is None else time.monotonic() + max_wait
+
+
 class MatchbookClient:
     """
     Matchbook REST API client with session management.
     Caches session-token and account (balance, free-funds, exposure).
-    Re-login on 401. Exponential backoff on 429 and network errors.
+    Re-login on 401. Full-jitter backoff on 429 and network errors.
+    Reuses keep-alive connections through one requests.Session per client.
     """
 
+    __slots__ = (
+        "username",
+        "password",
+        "timeout",
+        "_session_token",
+        "_account",
+        "_request_slots",
+        "_login_lock",
+        "_login_epoch",
+        "_http",
+        "_etag_cache",
+        "_etag_lock",
+    )
+
     def __init__(
         self,
         username: Optional[str] = None,
@@ -67,6 +161,33 @@ class MatchbookClient:
         self.timeout = timeout
         self._session_token: Optional[str] = None
         self._account: Optional[dict] = None
+        # Caps concurrent calls so bursts of reruns cannot trip the rate limit
+        self._request_slots = threading.BoundedSemaphore(MAX_CONCURRENT_REQUESTS)
+        # One client is shared by dashboard threads; token refresh must not interleave.
+        # The epoch counts successful logins so concurrent 401s trigger only one.
+        self._login_lock = threading.Lock()
+        self._login_epoch = 0
+        # Pooled keep-alive transport: avoids a fresh TCP + TLS handshake per call.
+        # Static headers live on the session; login() adds the session-token.
+        self._http = requests.Session()
+        self._http.headers.update(self._headers(include_auth=False))
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=POOL_MAXSIZE, max_retries=GATEWAY_RETRY
+        )
+        self._http.mount("https://", adapter)
+        # (path, params) -> (etag, parsed body, fresh-until monotonic) for conditional GETs
+        self._etag_cache: OrderedDict[tuple, tuple[str, dict, float]] = OrderedDict()
+        self._etag_lock = threading.Lock()
+
+    def close(self) -> None:
+        """Close pooled connections. The client must not be used afterwards."""
+        self._http.close()
+
+    def __enter__(self) -> "MatchbookClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
 
     def _headers(self, include_auth: bool = True) -> dict:
         """Build request headers. Accept JSON, optional session-token."""
@@ -84,62 +205,133 @@ class MatchbookClient:
         self,
         method: str,
         path: str,
-        json_data: Optional[dict] = None,
+        json_data: Optional[Union[dict, bytes]] = None,
         params: Optional[dict] = None,
         retry_on_auth: bool = True,
+        conditional: bool = False,
+        deadline: Optional[float] = None,
     ) -> dict:
         """
         Execute HTTP request with retries for timeout, connection error, 401, 429.
-        On 401: re-login and retry once if retry_on_auth.
-        On 429: exponential backoff, retry.
+        502/503/504 on GET are retried by the adapter (GATEWAY_RETRY).
+        On 401: re-login (once across threads that saw the same token) and
+        retry once if retry_on_auth; the re-login does not use up an attempt.
+        On 429: wait Retry-After if given, else full-jitter backoff, then retry.
+        conditional (GET only): reuse a cached body for EVENTS_CACHE_TTL, then
+        revalidate with If-None-Match; a 304 returns the cached body. Cached
+        bodies are shared between callers and must not be mutated.
+        json_data: dict to encode, or an already-encoded JSON body.
+        deadline: time.monotonic() value; a retry wait that would end past it
+        raises instead of sleeping (MatchbookRateLimitError for 429s).
         """
         url = BASE_URL + path
         last_error = None
-
-        for attempt in range(MAX_RETRIES):
+        # Encoded once, not per attempt
+        body = _dumps(json_data) if isinstance(json_data, dict) else json_data
+        cache_key = cached = None
+        headers = None
+        if conditional and method == "GET":
+            cache_key = (path, tuple(sorted((params or {}).items())))
+            cached = self._etag_get(cache_key)
+            if cached:
+                if time.monotonic() < cached[2]:
+                    return cached[1]
+                headers = {"If-None-Match": cached[0]}
+
+        attempt = 0
+        rate_limited = False  # the last attempt ended in a 429
+        while attempt < MAX_RETRIES:
+            # Login epoch the request is sent under, to detect a concurrent re-login
+            epoch = self._login_epoch
             try:
-                resp = requests.request(
-                    method=method,
-                    url=url,
-                    json=json_data,
-                    params=params,
-                    headers=self._headers(),
-                    timeout=self.timeout,
-                )
+                with self._request_slots:
+                    resp = self._http.request(
+                        method=method,
+                        url=url,
+                        data=body,
+                        params=params,
+                        headers=headers,
+                        timeout=self.timeout,
+                    )
 
                 if resp.status_code == 401 and retry_on_auth:
                     logger.warning("Session expired (401), re-loginning...")
-                    self.login()
-                    return self._request(method, path, json_data, params, retry_on_auth=False)
+                    self._relogin(epoch)
+                    retry_on_auth = False
+                    continue
+
+                if resp.status_code == 304 and cached:
+                    self._etag_put(cache_key, cached[0], cached[1])
+                    return cached[1]
 
                 if resp.status_code == 429:
-                    wait = RATE_LIMIT_BACKOFF * (RETRY_BACKOFF_BASE ** attempt)
-                    logger.warning("Rate limit (429), backing off %s seconds", wait)
+                    wait = _retry_after(resp)
+                    if wait is None:
+                        wait = _backoff(attempt, RATE_LIMIT_BACKOFF)
+                    if deadline is not None and time.monotonic() + wait > deadline:
+                        raise MatchbookRateLimitError(
+                            f"Rate limited (429); retry in {wait:.1f}s would pass the deadline", status_code=429
+                        )
+                    logger.warning("Rate limit (429), backing off %.1f seconds", wait)
                     time.sleep(wait)
+                    rate_limited = True
+                    attempt += 1
                     continue
 
                 if resp.status_code >= 400:
                     try:
-                        err_body = resp.json()
+                        err_body = _loads(resp.content)
                     except Exception:
                         err_body = resp.text
                     raise MatchbookAPIError(
-                        f"API error {resp.status_code}: {err_body}"
+                        f"API error {resp.status_code}: {err_body}", status_code=resp.status_code
                     )
 
-                return resp.json() if resp.content else {}
+                data = _loads(resp.content) if resp.content else {}
+                etag = resp.headers.get("ETag")
+                if cache_key and etag:
+                    self._etag_put(cache_key, etag, data)
+                return data
 
             except requests.exceptions.Timeout as e:
-                last_error = e
+                last_error, rate_limited = e, False
                 logger.warning("Request timeout (attempt %s/%s)", attempt + 1, MAX_RETRIES)
-                time.sleep(RETRY_BACKOFF_BASE ** attempt)
+                self._sleep_before_retry(attempt, deadline, e)
+                attempt += 1
             except requests.exceptions.ConnectionError as e:
-                last_error = e
+                last_error, rate_limited = e, False
                 logger.warning("Connection error (attempt %s/%s)", attempt + 1, MAX_RETRIES)
-                time.sleep(RETRY_BACKOFF_BASE ** attempt)
+                self._sleep_before_retry(attempt, deadline, e)
+                attempt += 1
 
+        if rate_limited:
+            raise MatchbookRateLimitError(f"Still rate limited (429) after {MAX_RETRIES} attempts", status_code=429)
         raise MatchbookAPIError(f"Request failed after {MAX_RETRIES} attempts: {last_error}")
 
+    def _etag_get(self, key: tuple) -> Optional[tuple[str, dict, float]]:
+        """Cached (etag, body, fresh-until) for key, marked most recently used."""
+        with self._etag_lock:
+            entry = self._etag_cache.get(key)
+            if entry is not None:
+                self._etag_cache.move_to_end(key)
+            return entry
+
+    def _etag_put(self, key: tuple, etag: str, body: dict) -> None:
+        """Store a response fresh for EVENTS_CACHE_TTL, evicting beyond ETAG_CACHE_MAX_ENTRIES."""
+        with self._etag_lock:
+            self._etag_cache[key] = (etag, body, time.monotonic() + EVENTS_CACHE_TTL)
+            self._etag_cache.move_to_end(key)
+            while len(self._etag_cache) > ETAG_CACHE_MAX_ENTRIES:
+                self._etag_cache.popitem(last=False)
+
+    @staticmethod
+    def _sleep_before_retry(attempt: int, deadline: Optional[float], error: Exception) -> None:
+        """Back off after a network error, unless the wait would pass the deadline."""
+        wait = _backoff(attempt, RETRY_BACKOFF_BASE)
+        if deadline is not None and time.monotonic() + wait > deadline:
+            raise MatchbookAPIError(f"Request failed before deadline: {error}")
+        time.sleep(wait)
+
     def login(self) -> dict:
         """
         Login to Matchbook. POST /bpapi/rest/security/session.
@@ -149,17 +341,32 @@ class MatchbookClient:
         if not self.username or not self.password:
             raise MatchbookAuthError("MATCHBOOK_USERNAME and MATCHBOOK_PASSWORD must be set in .env")
 
+        with self._login_lock:
+            return self._login_locked()
+
+    def _relogin(self, epoch: int) -> None:
+        """
+        Re-login after a 401 on a request sent at login `epoch`. If another
+        thread logged in since then, reuse its token instead of logging in again.
+        """
+        with self._login_lock:
+            if self._login_epoch == epoch:
+                self._login_locked()
+
+    def _login_locked(self) -> dict:
+        """Perform the login round-trip; caller holds _login_lock."""
         payload = {"username": self.username, "password": self.password}
-        resp = requests.post(
-            BASE_URL + SESSION_ENDPOINT,
-            json=payload,
-            headers=self._headers(include_auth=False),
-            timeout=self.timeout,
-        )
+        with self._request_slots:
+            resp = self._http.post(
+                BASE_URL + SESSION_ENDPOINT,
+                data=_dumps(payload),
+                headers={"session-token": None},  # never send a stale token to login
+                timeout=self.timeout,
+            )
 
         if resp.status_code == 400:
             try:
-                err = resp.json()
+                err = _loads(resp.content)
                 msg = err.get("errors", [{}])[0].get("messages", ["Login failed"])[0]
             except Exception:
                 msg = resp.text
@@ -168,12 +375,15 @@ class MatchbookClient:
         if resp.status_code != 200:
             raise MatchbookAuthError(f"Login failed: {resp.status_code} {resp.text}")
 
-        data = resp.json()
+        data = _loads(resp.content)
         self._session_token = data.get("session-token")
         self._account = data.get("account", {})
 
         if not self._session_token:
+            self._http.headers.pop("session-token", None)
             raise MatchbookAuthError("No session-token in login response")
+        self._http.headers["session-token"] = self._session_token
+        self._login_epoch += 1
 
         logger.info("Logged in successfully. Balance: %s", self._account.get("balance"))
         return data
@@ -184,14 +394,14 @@ class MatchbookClient:
         Returns session info or None if 401.
         """
         try:
-            resp = requests.get(
-                BASE_URL + SESSION_ENDPOINT,
-                headers=self._headers(),
-                timeout=self.timeout,
-            )
+            with self._request_slots:
+                resp = self._http.get(
+                    BASE_URL + SESSION_ENDPOINT,
+                    timeout=self.timeout,
+                )
             if resp.status_code == 401:
                 return None
-            return resp.json() if resp.content else {}
+            return _loads(resp.content) if resp.content else {}
         except Exception as e:
             logger.warning("Session check failed: %s", e)
             return None
@@ -226,6 +436,8 @@ class MatchbookClient:
         Fetch events with markets and prices. GET /edge/rest/events.
         Returns events with nested markets and runners (prices).
         ids: comma-separated event IDs to filter (e.g. "1234567890").
+        Identical calls within EVENTS_CACHE_TTL share one response, and
+        unchanged events are revalidated by ETag (304, no body).
         """
         params = {
             "include-prices": include_prices,
@@ -244,51 +456,80 @@ class MatchbookClient:
         if ids:
             params["ids"] = ids
 
-        return self._request("GET", EVENTS_ENDPOINT, params=params)
+        return self._request("GET", EVENTS_ENDPOINT, params=params, conditional=True)
+
+    def iter_events(self, per_page: int = 20, **kwargs: Any) -> Iterator[dict]:
+        """
+        Yield events across all pages of get_events; kwargs are passed to it.
+        The next page is fetched while the caller works through the current one.
+        """
+        return self._iter_pages(self.get_events, "events", per_page, kwargs)
+
+    def get_events_many(self, id_batches: list[str], **kwargs: Any) -> list[dict]:
+        """
+        Fetch several event-id batches concurrently; one get_events response
+        per batch, in input order. Wall time is about one round-trip rather
+        than one per batch; in-flight calls are still capped by
+        MAX_CONCURRENT_REQUESTS. kwargs are passed to get_events.
+        """
+        if len(id_batches) <= 1:
+            return [self.get_events(ids=ids, **kwargs) for ids in id_batches]
+        workers = min(len(id_batches), MAX_CONCURRENT_REQUESTS)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(lambda ids: self.get_events(ids=ids, **kwargs), id_batches))
 
     def submit_offers(
         self,
         offers: list[dict],
         odds_type: str = "DECIMAL",
         exchange_type: str = "back-lay",
+        max_wait: Optional[float] = ORDER_DEADLINE_SEC,
     ) -> dict:
         """
         Submit one or more offers. POST /edge/rest/v2/offers.
         Each offer: {runner-id, side, odds, stake, keep-in-play?}
         Matchbook auto-rounds odds to valid ladder (Back: round up, Lay: round down).
+        max_wait: seconds of retry back-off allowed before giving up (None = no limit),
+        so a rate limit cannot hold an order until the price has moved on.
         """
-        payload = {
-            "odds-type": odds_type,
-            "exchange-type": exchange_type,
-            "offers": offers,
-        }
-        return self._request("POST", OFFERS_ENDPOINT, json_data=payload)
+        if odds_type == "DECIMAL" and exchange_type == "back-lay":
+            payload = _SUBMIT_PREFIX + _dumps(offers) + b"}"
+        else:
+            payload = {
+                "odds-type": odds_type,
+                "exchange-type": exchange_type,
+                "offers": offers,
+            }
+        return self._request("POST", OFFERS_ENDPOINT, json_data=payload, deadline=_deadline(max_wait))
 
     def cancel_offers(
         self,
-        offer_ids: Optional[list[int]] = None,
-        event_ids: Optional[list[int]] = None,
-        market_ids: Optional[list[int]] = None,
-        runner_ids: Optional[list[int]] = None,
+        offer_ids: Optional[Union[list[int], str]] = None,
+        event_ids: Optional[Union[list[int], str]] = None,
+        market_ids: Optional[Union[list[int], str]] = None,
+        runner_ids: Optional[Union[list[int], str]] = None,
+        max_wait: Optional[float] = ORDER_DEADLINE_SEC,
     ) -> dict:
         """
         Cancel offers. DELETE /edge/rest/v2/offers.
-        Pass comma-separated ids as query params.
+        Pass comma-separated ids as query params. Each argument is a list of
+        ids or an already comma-joined string, which is sent as-is.
+        max_wait: as for submit_offers.
         """
         params = {}
-        if offer_ids:
-            params["offer-ids"] = ",".join(str(x) for x in offer_ids)
-        if event_ids:
-            params["event-ids"] = ",".join(str(x) for x in event_ids)
-        if market_ids:
-            params["market-ids"] = ",".join(str(x) for x in market_ids)
-        if runner_ids:
-            params["runner-ids"] = ",".join(str(x) for x in runner_ids)
+        for name, ids in (
+            ("offer-ids", offer_ids),
+            ("event-ids", event_ids),
+            ("market-ids", market_ids),
+            ("runner-ids", runner_ids),
+        ):
+            if ids:
+                params[name] = ids if isinstance(ids, str) else ",".join(map(str, ids))
 
         if not params:
             raise ValueError("At least one of offer_ids, event_ids, market_ids, runner_ids required")
 
-        return self._request("DELETE", OFFERS_ENDPOINT, params=params)
+        return self._request("DELETE", OFFERS_ENDPOINT, params=params, deadline=_deadline(max_wait))
 
     def get_offers(
         self,
@@ -305,6 +546,38 @@ class MatchbookClient:
             params["status"] = status
         return self._request("GET", OFFERS_ENDPOINT, params=params)
 
+    def iter_offers(self, per_page: int = 50, **kwargs: Any) -> Iterator[dict]:
+        """
+        Yield offers across all pages of get_offers; kwargs are passed to it.
+        The next page is fetched while the caller works through the current one.
+        """
+        return self._iter_pages(self.get_offers, "offers", per_page, kwargs)
+
+    @staticmethod
+    def _iter_pages(fetch: Callable[..., dict], key: str, per_page: int, kwargs: dict) -> Iterator[dict]:
+        """
+        Walk offset pages of fetch(per_page=..., offset=..., **kwargs), yielding
+        the items under `key`, until a page comes back short. One page is
+        prefetched on a single worker thread.
+        """
+        offset = kwargs.pop("offset", 0)
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            page = pool.submit(fetch, per_page=per_page, offset=offset, **kwargs)
+            while page is not None:
+                items = page.result().get(key, [])
+                offset += per_page
+                page = (
+                    pool.submit(fetch, per_page=per_page, offset=offset, **kwargs)
+                    if len(items) >= per_page
+                    else None
+                )
+                yield from items
+
+
+# Tick size per odds band: _TICK_SIZES[i] applies below _TICK_BOUNDS[i]
+_TICK_BOUNDS = (2.0, 3.0, 4.0, 6.0)
+_TICK_SIZES = (0.01, 0.02, 0.05, 0.1, 0.2)
+
 
 def add_ticks_to_odds(odds: float, ticks: int, side: str = "back") -> float:
     """
@@ -315,22 +588,12 @@ def add_ticks_to_odds(odds: float, ticks: int, side: str = "back") -> float:
     """
     if odds < 1.01:
         return odds
-    tick_size = 0.01
-    if odds >= 2.0 and odds < 3.0:
-        tick_size = 0.02
-    elif odds >= 3.0 and odds < 4.0:
-        tick_size = 0.05
-    elif odds >= 4.0 and odds < 6.0:
-        tick_size = 0.1
-    elif odds >= 6.0:
-        tick_size = 0.2
-
-    if side == "back":
-        return round(odds + ticks * tick_size, 2)
-    else:
-        return round(odds - ticks * tick_size, 2)
+    tick_size = _TICK_SIZES[bisect.bisect_right(_TICK_BOUNDS, odds)]
+    sign = 1 if side == "back" else -1
+    return round(odds + sign * ticks * tick_size, 2)
 
 
+@functools.lru_cache(maxsize=1024)
 def lay_liability(lay_stake: float, lay_odds: float) -> float:
     """
     Formula 2: Lay Liability = Lay_Stake * (Lay_Odds - 1)
@@ -339,6 +602,7 @@ def lay_liability(lay_stake: float, lay_odds: float) -> float:
     return lay_stake * (lay_odds - 1)
 
 
+@functools.lru_cache(maxsize=1024)
 def greening_up_lay_stake(back_stake: float, back_odds: float, lay_odds: float) -> float:
     """
     Formula 1: Lay_Stake = (Back_Stake * Back_Odds) / Lay_Odds
@@ -0,0 +1,113 @@
+"""Dashboard behaviour driven through Streamlit's AppTest with a fake Matchbook client."""
+
+import pathlib
+import tempfile
+import unittest
+from unittest import mock
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+import db
+import matchbook_api
+
+APP_PATH = str(pathlib.Path(__file__).resolve().parent.parent / "app.py")
+
+
+def _offer(offer_id: int, status: str) -> dict:
+    return {
+        "id": offer_id,
+        "status": status,
+        "side": "back",
+        "event-id": 10,
+        "market-id": 20,
+        "runner-id": 30,
+        "decimal-odds": 2.0,
+        "stake": 2.0,
+    }
+
+
+class CancelSelectedOfferTest(unittest.TestCase):
+    def setUp(self):
+        self.offers = [_offer(1, "open"), _offer(2, "open")]
+        self.cancelled = []
+
+        def login(client):
+            client._session_token = "t"
+            client._account = {"balance": 100.0, "exposure": 0.0, "free-funds": 100.0}
+            return {}
+
+        def cancel_offers(client, **kwargs):
+            self.cancelled.append(kwargs)
+            return {}
+
+        patches = [
+            mock.patch.object(db, "DB_PATH", pathlib.Path(tempfile.mkdtemp()) / "test.db"),
+            mock.patch.object(matchbook_api.MatchbookClient, "login", login),
+            mock.patch.object(
+                matchbook_api.MatchbookClient, "get_offers", lambda client, **kw: {"offers": list(self.offers)}
+            ),
+            mock.patch.object(matchbook_api.MatchbookClient, "get_events", lambda client, **kw: {"events": []}),
+            mock.patch.object(matchbook_api.MatchbookClient, "cancel_offers", cancel_offers),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        # Caches are per process: start every test from fresh API and DB reads
+        st.cache_data.clear()
+        st.cache_resource.clear()
+
+    def _cancel_button(self, at: AppTest):
+        return next(b for b in at.button if b.label == "Cancel selected offer")
+
+    def _select_row(self, at: AppTest, row: int) -> None:
+        """Set the positions table selection for the next run, as the browser would send it."""
+        positions_table = next(df for df in at.dataframe if df.key and df.key.startswith("positions_table"))
+        at.session_state[positions_table.key] = {"selection": {"rows": [row], "columns": []}}
+
+    def _refresh(self, at: AppTest) -> None:
+        next(b for b in at.button if b.label == "Refresh now").click()
+        at.run()
+
+    def test_selection_cancels_the_selected_offer(self):
+        at = AppTest.from_file(APP_PATH, default_timeout=30)
+        at.run()
+        self._select_row(at, 1)
+        at.run()
+        self._select_row(at, 1)
+        self._cancel_button(at).click()
+        at.run()
+        self.assertEqual(self.cancelled, [{"offer_ids": [2]}])
+
+    def test_changed_offers_clear_the_selection(self):
+        at = AppTest.from_file(APP_PATH, default_timeout=30)
+        at.run()
+        self._select_row(at, 1)
+        at.run()
+
+        # A new offer arrives ahead of the selected one; row 1 is now offer 1
+        self._select_row(at, 1)
+        self.offers.insert(0, _offer(3, "open"))
+        self._refresh(at)
+        self.assertTrue(self._cancel_button(at).disabled)
+        self.assertEqual(self.cancelled, [])
+
+    def test_offers_changing_before_the_click_cancel_nothing(self):
+        at = AppTest.from_file(APP_PATH, default_timeout=30)
+        at.run()
+        self._select_row(at, 1)
+        at.run()
+        button = self._cancel_button(at)
+        self.assertFalse(button.disabled)
+
+        # The list changes while the enabled button is on screen; the click's
+        # rerun fetches the new list, in which row 1 is a different offer
+        self._select_row(at, 1)
+        self.offers.insert(0, _offer(3, "open"))
+        st.cache_data.clear()
+        button.click()
+        at.run()
+        self.assertEqual(self.cancelled, [])
+
+if __name__ == "__main__":
+    unittest.main()
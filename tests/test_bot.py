@@ -0,0 +1,64 @@
+"""Bot phase logic against a fake client and a throwaway database."""
+
+import pathlib
+import tempfile
+import unittest
+from unittest import mock
+
+import bot
+import db
+
+
+class _ReversingClient:
+    """Answers submit_offers in reverse order; only the first offer sent is matched."""
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit_offers(self, offers, **kwargs):
+        self.submitted.append(offers)
+        answered = [dict(o, status="matched" if i == 0 else "open") for i, o in enumerate(offers)]
+        return {"offers": answered[::-1]}
+
+
+def _events(best_lay: float) -> dict:
+    prices = [{"side": "back", "decimal-odds": best_lay - 0.05}, {"side": "lay", "decimal-odds": best_lay}]
+    runner = {"id": 30, "name": "A", "prices": prices}
+    return {"events": [{"id": 10, "markets": [{"id": 20, "status": "open", "runners": [runner]}]}]}
+
+
+def _matched_back(offer_id: int, stake: float, odds: float) -> dict:
+    return {
+        "id": offer_id,
+        "side": "back",
+        "status": "matched",
+        "runner-id": 30,
+        "event-id": 10,
+        "market-id": 20,
+        "decimal-odds": odds,
+        "stake": stake,
+    }
+
+
+class GreenUpTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(db, "DB_PATH", pathlib.Path(tempfile.mkdtemp()) / "test.db")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        db.init_db()
+
+    def test_same_runner_lays_recorded_from_returned_offers(self):
+        client = _ReversingClient()
+        offers = {"offers": [_matched_back(1, 7.0, 2.0), _matched_back(2, 9.0, 3.0)]}
+        # Odds outside the Phase 1 Back range, so only the green-up batch is submitted
+        bot.run_phase1(client, 100.0, 90.0, _events(best_lay=12.0), offers)
+
+        self.assertEqual(len(client.submitted), 1)
+        first_lay = client.submitted[0][0]
+        self.assertEqual(first_lay["stake"], 1.17)  # 7 * 2 / 12, rounded as sent
+        recorded = [(t["stake"], t["odds"]) for t in db.get_trades() if t["side"] == "lay"]
+        self.assertEqual(recorded, [(first_lay["stake"], first_lay["odds"])])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+"""Transport retry behaviour of MatchbookClient against a local HTTP server."""
+
+import http.server
+import threading
+import time
+import unittest
+
+import matchbook_api
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    # (status, headers) returned for each request, in order; the last one repeats
+    responses: list[tuple[int, dict]] = []
+    hits = 0
+
+    def _reply(self):
+        cls = type(self)
+        status, headers = cls.responses[min(cls.hits, len(cls.responses) - 1)]
+        cls.hits += 1
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    do_GET = do_POST = do_DELETE = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+class _ServerTestCase(unittest.TestCase):
+    """Runs _Handler on a local port; self.client routes http:// through its https adapter."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = "http://127.0.0.1:%d/edge/rest/events" % cls.server.server_port
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        _Handler.hits = 0
+        self.client = matchbook_api.MatchbookClient("u", "p")
+        # Route plain-http test traffic through the client's https adapter
+        self.client._http.mount("http://", self.client._http.get_adapter(matchbook_api.BASE_URL))
+
+    def tearDown(self):
+        self.client.close()
+
+
+class GatewayRetryTest(_ServerTestCase):
+    def test_429_with_retry_after_is_not_retried_by_transport(self):
+        _Handler.responses = [(429, {"Retry-After": "1"})]
+        resp = self.client._http.get(self.url, timeout=5)
+        self.assertEqual(resp.status_code, 429)
+        self.assertEqual(_Handler.hits, 1)
+
+    def test_503_with_retry_after_is_not_slept_on_by_transport(self):
+        _Handler.responses = [(503, {"Retry-After": "30"}), (200, {})]
+        resp = self.client._http.get(self.url, timeout=5)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(_Handler.hits, 2)
+
+    def test_gateway_error_on_get_is_retried_by_transport(self):
+        _Handler.responses = [(502, {}), (504, {}), (200, {})]
+        resp = self.client._http.get(self.url, timeout=5)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(_Handler.hits, 3)
+
+    def test_delete_is_not_retried_by_transport(self):
+        _Handler.responses = [(503, {})]
+        resp = self.client._http.delete(self.url, timeout=5)
+        self.assertEqual(resp.status_code, 503)
+        self.assertEqual(_Handler.hits, 1)
+
+    def test_post_is_never_retried_by_transport(self):
+        _Handler.responses = [(503, {})]
+        resp = self.client._http.post(self.url, data=b"{}", timeout=5)
+        self.assertEqual(resp.status_code, 503)
+        self.assertEqual(_Handler.hits, 1)
+
+
+class OrderDeadlineTest(_ServerTestCase):
+    """cancel_offers must give up within max_wait whatever the server answers."""
+
+    def setUp(self):
+        super().setUp()
+        self._base_url = matchbook_api.BASE_URL
+        matchbook_api.BASE_URL = self.url.rsplit("/edge", 1)[0]
+
+    def tearDown(self):
+        matchbook_api.BASE_URL = self._base_url
+        super().tearDown()
+
+    def _assert_cancel_gives_up_in_time(self):
+        start = time.monotonic()
+        with self.assertRaises(matchbook_api.MatchbookAPIError):
+            self.client.cancel_offers(offer_ids=[1], max_wait=1.0)
+        self.assertLess(time.monotonic() - start, 1.0)
+
+    def test_cancel_on_503_respects_deadline(self):
+        _Handler.responses = [(503, {"Retry-After": "1"})]
+        self._assert_cancel_gives_up_in_time()
+        self.assertEqual(_Handler.hits, 1)
+
+    def test_cancel_on_429_respects_deadline(self):
+        _Handler.responses = [(429, {"Retry-After": "5"})]
+        self._assert_cancel_gives_up_in_time()
+        self.assertEqual(_Handler.hits, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()